@@ -0,0 +1,59 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import asyncpg
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS weather_reports (
+    id serial PRIMARY KEY,
+    city text NOT NULL,
+    temperature double precision NOT NULL,
+    fetched_at timestamptz NOT NULL
+);
+"""
+
+
+class ReportStore:
+    """Postgres pool for saved weather reports, shared by every MCP session.
+
+    The pool is only opened (and the table created) by the first save, so
+    sessions that never save don't need a database at all. It is closed when
+    the last running() exits.
+    """
+
+    def __init__(self, dsn: str | None):
+        self.dsn = dsn
+        self._pool: asyncpg.Pool | None = None
+        self._lock = asyncio.Lock()
+        self._users = 0
+
+    @asynccontextmanager
+    async def running(self):
+        self._users += 1
+        try:
+            yield self
+        finally:
+            self._users -= 1
+            if self._users == 0 and self._pool is not None:
+                pool, self._pool = self._pool, None
+                await pool.close()
+
+    async def pool(self) -> asyncpg.Pool:
+        if self._pool is None:
+            if not self.dsn:
+                raise RuntimeError("DATABASE_URL missing")
+            async with self._lock:
+                if self._pool is None:
+                    pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=5)
+                    async with pool.acquire() as conn:
+                        await conn.execute(SCHEMA)
+                    self._pool = pool
+        return self._pool
+
+    async def save(self, city: str, temperature: float, fetched_at: str):
+        pool = await self.pool()
+        async with pool.acquire() as conn:
+            await conn.execute(
+                "INSERT INTO weather_reports (city, temperature, fetched_at) VALUES ($1, $2, $3)",
+                city, temperature, fetched_at
+            )
@@ -1,13 +1,12 @@
 # server.py
 import os
-import datetime
 from pathlib import Path
 from types import SimpleNamespace
 from contextlib import asynccontextmanager
-import httpx
-import asyncpg
 from dotenv import load_dotenv
 from mcp.server.fastmcp import FastMCP, Context
+from db_tool import ReportStore
+from weather_service import WeatherService
 
 load_dotenv()
 
@@ -15,54 +14,34 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
 NOTES_DIR = Path("notes")
 NOTES_DIR.mkdir(exist_ok=True)
+# Shared by every session so the cache and connections outlive a single client
+weather_service = WeatherService(OPENWEATHER_API_KEY)
+# Connects on the first save_weather, the other tools work without Postgres
+reports = ReportStore(DATABASE_URL)
 
 @asynccontextmanager
-async def lifespan():
-    # init DB pool and ensure table exists
-    pool = await asyncpg.create_pool(DATABASE_URL, min_size=1, max_size=5)
-    async with pool.acquire() as conn:
-        await conn.execute("""
-        CREATE TABLE IF NOT EXISTS weather_reports (
-            id serial PRIMARY KEY,
-            city text NOT NULL,
-            temperature double precision NOT NULL,
-            fetched_at timestamptz NOT NULL
-        );
-        """)
-    yield SimpleNamespace(db=pool, notes_dir=NOTES_DIR)
-    await pool.close()
+async def lifespan(server: FastMCP):
+    async with weather_service.running(), reports.running():
+        yield SimpleNamespace(db=reports, notes_dir=NOTES_DIR, weather=weather_service)
 
-mcp = FastMCP("weather-server")
+mcp = FastMCP("weather-server", lifespan=lifespan)
 
 # ---- Weather tool ----
 @mcp.tool()
-async def get_weather(city: str, unit: str = "celsius") -> dict:
-    """Get current temperature for a city using OpenWeatherMap."""
-    if not OPENWEATHER_API_KEY:
-        raise RuntimeError("OPENWEATHER_API_KEY missing")
-    params = {
-        "q": city,
-        "appid": OPENWEATHER_API_KEY,
-        "units": "metric" if unit.lower().startswith("c") else "imperial",
-    }
-    async with httpx.AsyncClient() as client:
-        r = await client.get("https://api.openweathermap.org/data/2.5/weather", params=params, timeout=10.0)
-        r.raise_for_status()
-        data = r.json()
-    temp = float(data["main"]["temp"])
-    fetched_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
-    return {"city": city, "temperature": temp, "unit": unit, "fetched_at": fetched_at}
+async def get_weather(city: str, ctx: Context, unit: str = "celsius") -> dict:
+    """Get current temperature for a city using OpenWeatherMap (cached for a few minutes)."""
+    return await ctx.request_context.lifespan_context.weather.get_weather(city, unit)
+
+@mcp.tool()
+async def get_weather_many(cities: list[str], ctx: Context, unit: str = "celsius") -> list[dict]:
+    """Get current temperature for many cities (names or numeric OpenWeatherMap city ids); failed cities get an error entry."""
+    return await ctx.request_context.lifespan_context.weather.get_weather_many(cities, unit)
 
 # ---- DB tool ----
 @mcp.tool()
 async def save_weather(city: str, temperature: float, fetched_at: str, ctx: Context) -> dict:
     """Save weather report into Postgres (returns status)."""
-    pool = ctx.request_context.lifespan_context.db
-    async with pool.acquire() as conn:
-        await conn.execute(
-            "INSERT INTO weather_reports (city, temperature, fetched_at) VALUES ($1, $2, $3)",
-            city, temperature, fetched_at
-        )
+    await ctx.request_context.lifespan_context.db.save(city, temperature, fetched_at)
     return {"status": "saved"}
 
 # ---- File tools (safe) ----
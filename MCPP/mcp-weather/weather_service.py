@@ -0,0 +1,170 @@
+import asyncio
+import datetime
+import os
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+
+WEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
+# Current weather for up to 20 city ids in one call
+GROUP_URL = "https://api.openweathermap.org/data/2.5/group"
+GROUP_MAX_IDS = 20
+# Upstream calls one get_weather_many may have in flight
+WEATHER_CONCURRENCY = int(os.getenv("WEATHER_CONCURRENCY", "8"))
+# OpenWeatherMap refreshes current weather roughly every 10 minutes
+WEATHER_CACHE_TTL = float(os.getenv("WEATHER_CACHE_TTL", "600"))
+WEATHER_CACHE_SIZE = 1024
+
+
+class WeatherService:
+    """Current weather from OpenWeatherMap over one pooled HTTP client.
+
+    Results are cached per (city, unit) for WEATHER_CACHE_TTL seconds and
+    concurrent lookups of the same city and unit share one upstream call.
+    MCP runs the server lifespan once per session, so the client is opened by
+    the first running() and closed when the last one exits.
+    """
+
+    def __init__(self, api_key: str | None, ttl: float = WEATHER_CACHE_TTL):
+        self.api_key = api_key
+        self.ttl = ttl
+        self._client: httpx.AsyncClient | None = None
+        self._users = 0
+        self._cache: dict[tuple, tuple[float, dict]] = {}
+        self._inflight: dict[tuple, asyncio.Task] = {}
+
+    @asynccontextmanager
+    async def running(self):
+        if self._users == 0:
+            self._client = httpx.AsyncClient(
+                timeout=10.0,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60),
+            )
+        self._users += 1
+        try:
+            yield self
+        finally:
+            self._users -= 1
+            if self._users == 0:
+                await self._client.aclose()
+                self._client = None
+
+    def _cached(self, key: tuple) -> dict | None:
+        cached = self._cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        return None
+
+    def _store(self, key: tuple, temperature: float) -> dict:
+        result = {
+            "temperature": temperature,
+            "fetched_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        }
+        if len(self._cache) >= WEATHER_CACHE_SIZE:
+            self._cache.pop(next(iter(self._cache)))
+        self._cache[key] = (time.monotonic() + self.ttl, result)
+        return result
+
+    async def get_weather(self, city: str, unit: str = "celsius") -> dict:
+        if not self.api_key:
+            raise RuntimeError("OPENWEATHER_API_KEY missing")
+        units = _units(unit)
+        key = (" ".join(city.split()).casefold(), units)
+
+        result = self._cached(key)
+        if result is None:
+            task = self._inflight.get(key)
+            if task is None:
+                task = self._inflight[key] = asyncio.create_task(self._fetch(key, city, units))
+            # One caller giving up must not cancel the call the others wait on
+            result = await asyncio.shield(task)
+        return {"city": city, "temperature": result["temperature"], "unit": unit, "fetched_at": result["fetched_at"]}
+
+    async def _fetch(self, key: tuple, city: str, units: str) -> dict:
+        try:
+            params = {"q": city, "appid": self.api_key, "units": units}
+            r = await self._client.get(WEATHER_URL, params=params)
+            r.raise_for_status()
+            data = r.json()
+            return self._store(key, float(data["main"]["temp"]))
+        finally:
+            del self._inflight[key]
+
+    async def get_weather_many(self, cities: list[str], unit: str = "celsius",
+                               concurrency: int = WEATHER_CONCURRENCY) -> list[dict]:
+        """Weather for many cities, in input order, with an `error` entry for each failure.
+
+        Names are looked up concurrently, at most `concurrency` at a time. Numeric
+        entries are OpenWeatherMap city ids and go through the group endpoint,
+        20 per call.
+        """
+        if not self.api_key:
+            raise RuntimeError("OPENWEATHER_API_KEY missing")
+        semaphore = asyncio.Semaphore(concurrency)
+        ids = list(dict.fromkeys(c.strip() for c in cities if c.strip().isdigit()))
+
+        async def by_name(city: str) -> dict:
+            try:
+                async with semaphore:
+                    return await self.get_weather(city, unit)
+            except Exception as exc:
+                return {"city": city, "error": _describe(exc)}
+
+        async def by_ids(chunk: list[str]) -> dict[str, dict]:
+            try:
+                async with semaphore:
+                    found = await self._fetch_group(chunk, _units(unit))
+            except Exception as exc:
+                return {city_id: {"city": city_id, "error": _describe(exc)} for city_id in chunk}
+            return {
+                city_id: {"city": city_id, "temperature": found[city_id]["temperature"], "unit": unit,
+                          "fetched_at": found[city_id]["fetched_at"]}
+                if city_id in found else {"city": city_id, "error": "city id not found"}
+                for city_id in chunk
+            }
+
+        names = [c for c in cities if not c.strip().isdigit()]
+        named, grouped = await asyncio.gather(
+            asyncio.gather(*(by_name(city) for city in names)),
+            asyncio.gather(*(by_ids(ids[i:i + GROUP_MAX_IDS]) for i in range(0, len(ids), GROUP_MAX_IDS))),
+        )
+        by_id = {city_id: result for chunk in grouped for city_id, result in chunk.items()}
+        named = iter(named)
+        results = []
+        for city in cities:
+            results.append({**by_id[city.strip()], "city": city} if city.strip().isdigit() else next(named))
+        return results
+
+    async def _fetch_group(self, ids: list[str], units: str) -> dict[str, dict]:
+        """Cached results for city ids, fetching the missing ones in one group call."""
+        found = {}
+        missing = []
+        for city_id in ids:
+            result = self._cached(("id", city_id, units))
+            if result is None:
+                missing.append(city_id)
+            else:
+                found[city_id] = result
+        if missing:
+            params = {"id": ",".join(missing), "appid": self.api_key, "units": units}
+            r = await self._client.get(GROUP_URL, params=params)
+            r.raise_for_status()
+            for item in r.json().get("list", []):
+                city_id = str(item["id"])
+                found[city_id] = self._store(("id", city_id, units), float(item["main"]["temp"]))
+        return found
+
+
+def _units(unit: str) -> str:
+    return "metric" if unit.lower().startswith("c") else "imperial"
+
+
+def _describe(exc: Exception) -> str:
+    if isinstance(exc, httpx.HTTPStatusError):
+        try:
+            message = exc.response.json().get("message")
+        except ValueError:
+            message = None
+        return f"{exc.response.status_code}: {message or exc.response.reason_phrase}"
+    return str(exc) or type(exc).__name__
@@ -1,25 +1,30 @@
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import FastMCP, Context
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
 from dotenv import load_dotenv
 import os
-import httpx
-import datetime
 import json
+from weather_service import WeatherService
 
 load_dotenv()
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
-mcp = FastMCP("weather")
+weather_service = WeatherService(OPENWEATHER_API_KEY)
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    async with weather_service.running():
+        yield SimpleNamespace(weather=weather_service)
+
+mcp = FastMCP("weather", lifespan=lifespan)
 
 @mcp.tool(
     description="Get current temperature for a city. Input should be a JSON string like '{\"city\": \"London\", \"unit\": \"celsius\"}'."
 )
-async def get_weather(input_str: str) -> dict:
+async def get_weather(input_str: str, ctx: Context) -> dict:
     """
     Get current temperature for a city using OpenWeatherMap.
     The input should be a JSON string like '{"city": "London", "unit": "celsius"}'
     """
-    if not OPENWEATHER_API_KEY:
-        raise RuntimeError("OPENWEATHER_API_KEY missing")
-
     try:
         input_data = json.loads(input_str)
         city = input_data.get("city")
@@ -30,18 +35,7 @@ async def get_weather(input_str: str) -> dict:
     if not city:
         raise ValueError("City not provided in the input.")
 
-    params = {
-        "q": city,
-        "appid": OPENWEATHER_API_KEY,
-        "units": "metric" if unit.lower().startswith("c") else "imperial",
-    }
-    async with httpx.AsyncClient() as client:
-        r = await client.get("https://api.openweathermap.org/data/2.5/weather", params=params, timeout=10.0)
-        r.raise_for_status()
-        data = r.json()
-    temp = float(data["main"]["temp"])
-    fetched_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
-    return {"city": city, "temperature": temp, "unit": unit, "fetched_at": fetched_at}
+    return await ctx.request_context.lifespan_context.weather.get_weather(city, unit)
 
 if __name__ == "__main__":
     mcp.run(transport="streamable-http")
\ No newline at end of file
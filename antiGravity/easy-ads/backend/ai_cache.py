@@ -0,0 +1,179 @@
+import asyncio
+import hashlib
+import os
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import delete, select
+
+from database import AsyncSessionLocal
+from ai_service import ai_service
+from metrics import InstrumentedAIService
+import models
+
+# Cache tuning, override via env
+AI_CACHE_MEMORY_SIZE = int(os.getenv("AI_CACHE_MEMORY_SIZE", "1024"))
+AI_CACHE_DB_MAX_ROWS = int(os.getenv("AI_CACHE_DB_MAX_ROWS", "100000"))
+AI_CACHE_TTL_SECONDS = int(os.getenv("AI_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+UPLOADS_PREFIX = "/uploads/"
+_CONTENT_ADDRESSED = re.compile(r"/([0-9a-f]{64})\.\w+$")
+
+
+def normalize_prompt(prompt: str) -> str:
+    return " ".join(prompt.lower().split())
+
+
+def cache_key(prompt: str, image_digest: str) -> str:
+    return hashlib.sha256(f"{normalize_prompt(prompt)}\0{image_digest}".encode("utf-8")).hexdigest()
+
+
+def _hash_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+async def image_digest(image_url: str) -> str:
+    """Content hash of a product image, falls back to the URL for remote images."""
+    match = _CONTENT_ADDRESSED.search(image_url)
+    if match:
+        # Uploads are stored under their sha256 already
+        return match.group(1)
+    if UPLOADS_PREFIX in image_url:
+        path = "uploads/" + image_url.split(UPLOADS_PREFIX, 1)[1]
+        if os.path.isfile(path):
+            return await asyncio.to_thread(_hash_file, path)
+    return hashlib.sha256(image_url.encode("utf-8")).hexdigest()
+
+
+class CachedAIService:
+    """Two tier result cache in front of an AI service.
+
+    Lookups go to an in-memory LRU first, then to the `ai_cache` table which
+    survives restarts. Both tiers expire entries after `ttl` seconds.
+    """
+
+    def __init__(self, service, maxsize: int = AI_CACHE_MEMORY_SIZE, ttl: int = AI_CACHE_TTL_SECONDS, max_rows: int = AI_CACHE_DB_MAX_ROWS):
+        self.service = service
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self._memory: "OrderedDict[str, Tuple[float, str, str]]" = OrderedDict()
+        self._puts = 0
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, image_url: str, video_url: str, stored_at: float):
+        self._memory[key] = (stored_at, image_url, video_url)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def _from_memory(self, key: str) -> Optional[Tuple[str, str]]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            stored_at, image_url, video_url = entry
+            if time.time() - stored_at < self.ttl:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return image_url, video_url
+            del self._memory[key]
+        return None
+
+    async def get(self, key: str) -> Optional[Tuple[str, str]]:
+        cached = self._from_memory(key)
+        if cached is not None:
+            return cached
+
+        async with AsyncSessionLocal() as db:
+            row = await db.get(models.AIResultCache, key)
+        age = (datetime.utcnow() - row.created_at).total_seconds() if row is not None else None
+        if age is not None and age < self.ttl:
+            self._remember(key, row.result_image_url, row.result_video_url, time.time() - age)
+            self.db_hits += 1
+            return row.result_image_url, row.result_video_url
+
+        self.misses += 1
+        return None
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Tuple[str, str]]:
+        """Cached results for many keys, one query for everything not in memory."""
+        found = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            cached = self._from_memory(key)
+            if cached is not None:
+                found[key] = cached
+            else:
+                missing.append(key)
+        if not missing:
+            return found
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(models.AIResultCache).where(models.AIResultCache.key.in_(missing)))
+            rows = result.scalars().all()
+        now = datetime.utcnow()
+        for row in rows:
+            age = (now - row.created_at).total_seconds()
+            if age < self.ttl:
+                self._remember(row.key, row.result_image_url, row.result_video_url, time.time() - age)
+                self.db_hits += 1
+                found[row.key] = row.result_image_url, row.result_video_url
+        self.misses += len(missing) - sum(key in found for key in missing)
+        return found
+
+    async def put(self, key: str, image_url: str, video_url: str):
+        self._remember(key, image_url, video_url, time.time())
+        async with AsyncSessionLocal() as db:
+            await db.merge(models.AIResultCache(
+                key=key,
+                result_image_url=image_url,
+                result_video_url=video_url,
+                created_at=datetime.utcnow(),
+            ))
+            await db.commit()
+        self._puts += 1
+        if self._puts % 100 == 0:
+            await self.evict()
+
+    async def evict(self):
+        """Drop expired rows and trim the table down to `max_rows`."""
+        async with AsyncSessionLocal() as db:
+            cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+            await db.execute(delete(models.AIResultCache).where(models.AIResultCache.created_at < cutoff))
+            keep = (
+                select(models.AIResultCache.key)
+                .order_by(models.AIResultCache.created_at.desc())
+                .limit(self.max_rows)
+            )
+            await db.execute(delete(models.AIResultCache).where(models.AIResultCache.key.not_in(keep)))
+            await db.commit()
+
+    async def generate(self, prompt: str, key: str) -> Tuple[str, str]:
+        cached = await self.get(key)
+        if cached is not None:
+            return cached
+        image_url = await self.service.generate_image(prompt)
+        video_url = await self.service.generate_video(image_url)
+        await self.put(key, image_url, video_url)
+        return image_url, video_url
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.db_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.memory_hits + self.db_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+
+cached_ai_service = CachedAIService(InstrumentedAIService(ai_service))
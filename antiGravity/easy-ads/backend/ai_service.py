@@ -1,15 +1,24 @@
 import asyncio
+import os
+
+# Simulated model latency in seconds, lowered for load tests
+MOCK_AI_IMAGE_SECONDS = float(os.getenv("MOCK_AI_IMAGE_SECONDS", "2"))
+MOCK_AI_VIDEO_SECONDS = float(os.getenv("MOCK_AI_VIDEO_SECONDS", "3"))
 
 class MockAIService:
+    def __init__(self, image_seconds: float = MOCK_AI_IMAGE_SECONDS, video_seconds: float = MOCK_AI_VIDEO_SECONDS):
+        self.image_seconds = image_seconds
+        self.video_seconds = video_seconds
+
     async def generate_image(self, prompt: str) -> str:
         # Simulate processing time
-        await asyncio.sleep(2)
+        await asyncio.sleep(self.image_seconds)
         # Return a placeholder image URL (using unsplash for realism)
         return "https://images.unsplash.com/photo-1523381210434-271e8be1f52b?ixlib=rb-1.2.1&auto=format&fit=crop&w=800&q=80"
 
     async def generate_video(self, image_url: str) -> str:
         # Simulate processing time
-        await asyncio.sleep(3)
+        await asyncio.sleep(self.video_seconds)
         # Return a placeholder video URL
         return "https://assets.mixkit.co/videos/preview/mixkit-fashion-model-posing-in-neon-light-39896-large.mp4"
 
@@ -0,0 +1,77 @@
+"""Login throughput benchmark.
+
+Fires concurrent logins at a running backend while another task keeps
+polling /health, then reports logins/sec and the latency percentiles the
+unrelated endpoint saw meanwhile. If bcrypt blocks the event loop the
+/health p99 climbs to roughly the cost of one hash.
+
+    uvicorn main:app
+    python benchmarks/bench_auth.py --logins 200 --concurrency 16
+
+Needs httpx (pip install httpx).
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+from stats import percentile
+
+
+async def login_worker(client, email, password, remaining, latencies, errors):
+    while remaining[0] > 0:
+        remaining[0] -= 1
+        start = time.perf_counter()
+        r = await client.post("/token", data={"username": email, "password": password})
+        latencies.append(time.perf_counter() - start)
+        if r.status_code != 200:
+            errors[r.status_code] = errors.get(r.status_code, 0) + 1
+
+
+async def probe(client, stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/health")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.005)
+
+
+async def main(args):
+    email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+    password = "bench-password"
+    limits = httpx.Limits(max_connections=args.concurrency + 2)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+        r = await client.post("/users/", json={"email": email, "password": password})
+        r.raise_for_status()
+
+        login_latencies, probe_latencies, errors = [], [], {}
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(probe(client, stop, probe_latencies))
+        remaining = [args.logins]
+
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            login_worker(client, email, password, remaining, login_latencies, errors)
+            for _ in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await probe_task
+
+    print(f"logins:        {args.logins} in {elapsed:.2f}s ({args.logins / elapsed:.1f}/s), errors: {errors or 'none'}")
+    for name, samples in (("login", login_latencies), ("/health", probe_latencies)):
+        print(
+            f"{name:<14} p50 {percentile(samples, 50) * 1000:7.1f}ms  "
+            f"p95 {percentile(samples, 95) * 1000:7.1f}ms  "
+            f"p99 {percentile(samples, 99) * 1000:7.1f}ms  (n={len(samples)})"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    asyncio.run(main(parser.parse_args()))
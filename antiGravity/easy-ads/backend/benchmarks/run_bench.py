@@ -0,0 +1,258 @@
+"""Load-test suite for the easy-ads backend.
+
+Boots main.app under uvicorn against a throwaway local database (SQLite
+by default, or any DATABASE_URL such as a local Postgres), seeds users,
+products and generations, then runs concurrent scripted scenarios and
+reports requests/sec and p50/p95/p99 per endpoint. Results are written
+as JSON so runs on different commits can be compared.
+
+    python benchmarks/run_bench.py --requests 300 --concurrency 32
+    python benchmarks/run_bench.py --compare benchmarks/results/<older>.json
+
+Needs httpx and aiosqlite (pip install httpx aiosqlite).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+
+from stats import summarize
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+PASSWORD = "bench-password"
+
+# 64x64 PNG, a random tail is appended per upload so hashes differ
+PNG_64X64 = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000040000000400802000000250be689000000"
+    "6349444154789cedcf410dc02000c040400d129188ac89e07159d253d0ceb3eff8b3a503"
+    "5e35a035a035a035a035a035a035a035a035a035a035a035a035a035a035a035a035a035"
+    "a035a035a035a035a035a035a035a035a035a035a035a035a035a07d1bd001e86c5d983b"
+    "0000000049454e44ae426082"
+)
+
+
+def configure(args):
+    """Environment for the app under test, must run before importing it."""
+    workdir = tempfile.mkdtemp(prefix="easyads-bench-")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite+aiosqlite:///{workdir}/bench.db"
+    os.environ.setdefault("DB_PROFILE", "prod")
+    os.environ["MOCK_AI_IMAGE_SECONDS"] = str(args.ai_image_seconds)
+    os.environ["MOCK_AI_VIDEO_SECONDS"] = str(args.ai_video_seconds)
+    os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    os.environ["PUBLIC_BASE_URL"] = f"http://127.0.0.1:{args.port}"
+    sys.path.insert(0, BACKEND_DIR)
+    # uploads/ is relative to the working directory
+    os.chdir(workdir)
+    return workdir
+
+
+async def seed(args):
+    from database import engine, Base, AsyncSessionLocal
+    import models, auth
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    hashed = auth.get_password_hash(PASSWORD)
+    async with AsyncSessionLocal() as db:
+        users = [models.User(email=f"seed-{i}@bench.local", hashed_password=hashed) for i in range(args.users)]
+        db.add_all(users)
+        await db.flush()
+        products = [
+            models.Product(name=f"Product {u.id}-{j}", description="Seeded product " * 10,
+                           image_url="http://127.0.0.1/seed.png", user_id=u.id)
+            for u in users for j in range(args.products_per_user)
+        ]
+        db.add_all(products)
+        await db.flush()
+        db.add_all([
+            models.Generation(product_id=p.id, prompt=f"Seeded prompt {k}", status="completed",
+                              result_image_url="http://127.0.0.1/r.png", result_video_url="http://127.0.0.1/r.mp4")
+            for p in products for k in range(args.generations_per_product)
+        ])
+        await db.commit()
+
+    owned = {}
+    for p in products:
+        owned.setdefault(p.user_id, []).append(p.id)
+    return [
+        {"email": u.email, "token": auth.create_access_token({"sub": u.email}), "products": owned.get(u.id, [])}
+        for u in users
+    ]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.elapsed = {}
+
+    async def call(self, endpoint, request):
+        start = time.perf_counter()
+        response = await request
+        self.latencies.setdefault(endpoint, []).append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            errors = self.errors.setdefault(endpoint, {})
+            errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+        return response
+
+
+def auth_header(user):
+    return {"Authorization": f"Bearer {user['token']}"}
+
+
+async def signup(client, rec, users):
+    await rec.call("POST /users/", client.post("/users/", json={"email": f"{uuid.uuid4().hex}@bench.local", "password": PASSWORD}))
+
+
+async def login(client, rec, users):
+    user = random.choice(users)
+    await rec.call("POST /token", client.post("/token", data={"username": user["email"], "password": PASSWORD}))
+
+
+async def upload(client, rec, users):
+    user = random.choice(users)
+    image = PNG_64X64 + uuid.uuid4().bytes
+    await rec.call("POST /products/", client.post(
+        "/products/", headers=auth_header(user),
+        data={"name": "Bench product", "description": "Uploaded by the benchmark"},
+        files={"file": ("bench.png", image, "image/png")},
+    ))
+
+
+async def generate(client, rec, users):
+    user = random.choice(users)
+    product_id = random.choice(user["products"])
+    await rec.call("POST /generate/", client.post(
+        "/generate/", headers=auth_header(user),
+        json={"product_id": product_id, "prompt": f"bench prompt {random.randint(0, 50)}"},
+    ))
+
+
+async def list_views(client, rec, users):
+    user = random.choice(users)
+    await rec.call("GET /products/", client.get("/products/", headers=auth_header(user)))
+    await rec.call("GET /products/dashboard", client.get("/products/dashboard", headers=auth_header(user)))
+    await rec.call("GET /generations/{product_id}", client.get(f"/generations/{random.choice(user['products'])}", headers=auth_header(user)))
+
+
+SCENARIOS = {
+    "signup": signup,
+    "login": login,
+    "upload": upload,
+    "generate": generate,
+    "list": list_views,
+}
+
+
+async def run_scenario(name, client, rec, users, requests, concurrency):
+    remaining = [requests]
+
+    async def worker():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            await SCENARIOS[name](client, rec, users)
+
+    before = set(rec.latencies)
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    for endpoint in set(rec.latencies) - before:
+        rec.elapsed[endpoint] = elapsed
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def print_report(results, baseline=None):
+    print(f"{'endpoint':<30} {'req':>6} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  errors")
+    for endpoint, r in results.items():
+        line = f"{endpoint:<30} {r['requests']:>6} {r['rps']:>9.1f} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f}  {r['errors'] or ''}"
+        old = (baseline or {}).get(endpoint)
+        if old:
+            line += f"  (rps {r['rps'] - old['rps']:+.1f}, p99 {r['p99_ms'] - old['p99_ms']:+.1f}ms)"
+        print(line)
+
+
+async def main(args):
+    import uvicorn
+    import httpx
+    import main as app_module
+
+    users = await seed(args)
+
+    server = uvicorn.Server(uvicorn.Config(app_module.app, host="127.0.0.1", port=args.port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    rec = Recorder()
+    limits = httpx.Limits(max_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=60) as client:
+            for name in args.scenarios:
+                await run_scenario(name, client, rec, users, args.requests, args.concurrency)
+    finally:
+        server.should_exit = True
+        await server_task
+        from database import engine
+        await engine.dispose()
+
+    results = {
+        endpoint: summarize(latencies, rec.elapsed[endpoint], rec.errors.get(endpoint))
+        for endpoint, latencies in rec.latencies.items()
+    }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="defaults to a fresh SQLite file")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--products-per-user", type=int, default=10)
+    parser.add_argument("--generations-per-product", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--ai-image-seconds", type=float, default=0.05)
+    parser.add_argument("--ai-video-seconds", type=float, default=0.05)
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--output", help="result file, defaults to benchmarks/results/<time>-<commit>.json")
+    parser.add_argument("--compare", help="earlier result file to diff against")
+    args = parser.parse_args()
+    # configure() changes directory, pin user supplied paths first
+    args.output = args.output and os.path.abspath(args.output)
+    args.compare = args.compare and os.path.abspath(args.compare)
+
+    configure(args)
+    results = asyncio.run(main(args))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print_report(results, baseline)
+
+    commit = git_commit()
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    output = args.output or os.path.join(RESULTS_DIR, f"{stamp}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "compare", "database_url")}
+    config["database"] = os.environ["DATABASE_URL"].split("://", 1)[0]
+    with open(output, "w") as f:
+        json.dump({"commit": commit, "timestamp": stamp, "config": config, "results": results}, f, indent=2)
+    print(f"\nwrote {output}")
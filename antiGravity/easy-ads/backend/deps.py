@@ -1,15 +1,74 @@
-from fastapi import Depends, HTTPException, status
+import os
+import time
+from collections import OrderedDict
+
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from jose import JWTError, jwt
 
-from database import get_db
+from database import AsyncSessionLocal, get_db
 import models, auth
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", "300"))
+
+
+class PrincipalCache:
+    """LRU of verified token -> user, an entry never outlives its token.
+
+    A hit skips both the signature check and the users lookup, so user
+    changes must call `invalidate` for the email.
+    """
+
+    def __init__(self, maxsize: int = PRINCIPAL_CACHE_SIZE, ttl: int = PRINCIPAL_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._by_email = {}
+
+    def get(self, token: str):
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if time.time() >= expires_at:
+            self._drop(token)
+            return None
+        self._entries.move_to_end(token)
+        return user
+
+    def put(self, token: str, user: models.User, token_exp: float):
+        self._entries[token] = (min(token_exp, time.time() + self.ttl), user)
+        self._entries.move_to_end(token)
+        self._by_email.setdefault(user.email, set()).add(token)
+        while len(self._entries) > self.maxsize:
+            self._drop(next(iter(self._entries)))
+
+    def invalidate(self, email: str):
+        for token in self._by_email.pop(email, ()):
+            self._entries.pop(token, None)
+
+    def _drop(self, token: str):
+        _, user = self._entries.pop(token)
+        tokens = self._by_email.get(user.email)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._by_email[user.email]
+
+
+principal_cache = PrincipalCache()
+
+
+async def _user_from_token(token: str, db: AsyncSession):
+    cached = principal_cache.get(token)
+    if cached is not None:
+        return cached
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -22,9 +81,22 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    
+
     result = await db.execute(select(models.User).filter(models.User.email == email))
     user = result.scalars().first()
     if user is None:
         raise credentials_exception
+    # Detach so the instance can be handed to later requests' sessions
+    db.expunge(user)
+    principal_cache.put(token, user, payload["exp"])
     return user
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    return await _user_from_token(token, db)
+
+
+async def get_current_user_from_query(token: str = Query(..., description="Access token, EventSource can't send headers")):
+    # Own short session, long lived streams must not pin a connection
+    async with AsyncSessionLocal() as db:
+        return await _user_from_token(token, db)
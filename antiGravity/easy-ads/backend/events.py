@@ -0,0 +1,68 @@
+import asyncio
+import json
+from typing import Dict, Optional, Set
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class Subscription:
+    def __init__(self, broker: "EventBroker", user_id: int, product_id: Optional[int]):
+        self.broker = broker
+        self.user_id = user_id
+        self.product_id = product_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def offer(self, event: dict):
+        if self.product_id is not None and event.get("product_id") != self.product_id:
+            return
+        if self.queue.full():
+            # Slow consumer, drop the oldest event rather than block publishers
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.broker.unsubscribe(self)
+
+
+class EventBroker:
+    """In-process pub/sub for Generation status changes, one channel per user."""
+
+    def __init__(self):
+        self._channels: Dict[int, Set[Subscription]] = {}
+
+    def subscribe(self, user_id: int, product_id: Optional[int] = None) -> Subscription:
+        sub = Subscription(self, user_id, product_id)
+        self._channels.setdefault(user_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        subs = self._channels.get(sub.user_id)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del self._channels[sub.user_id]
+
+    def publish(self, user_id: int, event: dict):
+        for sub in list(self._channels.get(user_id, ())):
+            sub.offer(event)
+
+
+def generation_event(gen) -> dict:
+    return {
+        "id": gen.id,
+        "product_id": gen.product_id,
+        "prompt": gen.prompt,
+        "status": gen.status,
+        "result_image_url": gen.result_image_url,
+        "result_video_url": gen.result_video_url,
+    }
+
+
+def format_sse(event: dict) -> str:
+    return f"event: generation\ndata: {json.dumps(event)}\n\n"
+
+
+generation_events = EventBroker()
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from database import AsyncSessionLocal
+from uploads import UPLOAD_DIR, public_url
+import models
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (160, 320, 640, 1280)
+VARIANT_FORMATS = {"webp": ("WEBP", 80), "jpeg": ("JPEG", 82)}
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def start_pool():
+    global _pool
+    _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+
+
+def stop_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def variant_path(digest: str, width: int, fmt: str) -> str:
+    ext = "jpg" if fmt == "jpeg" else fmt
+    return f"{UPLOAD_DIR}/variants/{digest[:2]}/{digest}-{width}.{ext}"
+
+
+def build_variants(src_path: str, digest: str) -> List[dict]:
+    """Resize one image into every width/format, runs inside the process pool.
+
+    Variants are named after the source digest, so an image that was
+    already processed is not resized again.
+    """
+    from PIL import Image
+
+    variants = []
+    with Image.open(src_path) as img:
+        img.seek(0)
+        img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+        # Never upscale, small originals get a single variant at their own width
+        widths = [w for w in VARIANT_WIDTHS if w < img.width] or [img.width]
+        for width in widths:
+            height = max(1, round(img.height * width / img.width))
+            resized = None
+            for fmt, (pil_format, quality) in VARIANT_FORMATS.items():
+                path = variant_path(digest, width, fmt)
+                if not os.path.exists(path):
+                    if resized is None:
+                        resized = img.resize((width, height), Image.LANCZOS)
+                    out = resized.convert("RGB") if pil_format == "JPEG" else resized
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    tmp = f"{path}.{os.getpid()}.tmp"
+                    out.save(tmp, pil_format, quality=quality, optimize=True)
+                    os.replace(tmp, path)
+                variants.append({"width": width, "format": fmt, "url": public_url(path)})
+    return variants
+
+
+async def generate_variants(product_id: int, src_path: str, digest: str):
+    """Pipeline stage run after create_product, keeps resizing off the event loop."""
+    loop = asyncio.get_running_loop()
+    try:
+        variants = await loop.run_in_executor(_pool, build_variants, src_path, digest)
+    except Exception:
+        logger.exception("Building image variants for product %s failed", product_id)
+        return
+    async with AsyncSessionLocal() as db:
+        product = await db.get(models.Product, product_id)
+        if product is not None:
+            product.image_variants = variants
+            await db.commit()
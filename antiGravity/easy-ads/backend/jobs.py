@@ -0,0 +1,398 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager, suppress
+from datetime import datetime, timedelta
+from typing import List, NamedTuple, Optional, Set
+
+from sqlalchemy import update
+from sqlalchemy.future import select
+
+from database import AsyncSessionLocal
+from ai_cache import cached_ai_service, cache_key, image_digest
+from events import generation_events, generation_event
+from metrics import track
+import models
+
+logger = logging.getLogger(__name__)
+
+# Worker pool sizing, override via env
+GENERATION_WORKERS = int(os.getenv("GENERATION_WORKERS", "4"))
+GENERATION_QUEUE_SIZE = int(os.getenv("GENERATION_QUEUE_SIZE", "100"))
+# Running jobs renew claimed_at every heartbeat. A job still "processing" with
+# no heartbeat for the lease is assumed to belong to a dead worker and is
+# handed out again
+GENERATION_LEASE_SECONDS = int(os.getenv("GENERATION_LEASE_SECONDS", "900"))
+GENERATION_HEARTBEAT_SECONDS = GENERATION_LEASE_SECONDS / 3
+
+# Batch pipeline limits, images and videos get separate concurrency shared by
+# every batch in the process
+BATCH_MAX_IN_FLIGHT = int(os.getenv("BATCH_MAX_IN_FLIGHT", "4"))
+BATCH_IMAGE_CONCURRENCY = int(os.getenv("BATCH_IMAGE_CONCURRENCY", "4"))
+BATCH_VIDEO_CONCURRENCY = int(os.getenv("BATCH_VIDEO_CONCURRENCY", "2"))
+BATCH_FLUSH_SIZE = int(os.getenv("BATCH_FLUSH_SIZE", "50"))
+# Results are also written when the oldest unwritten one is this old
+BATCH_FLUSH_SECONDS = float(os.getenv("BATCH_FLUSH_SECONDS", "1"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class BatchJob(NamedTuple):
+    generation_id: int
+    product_id: int
+    prompt: str
+    cache_key: str
+
+
+class GenerationQueue:
+    """Bounded queue of Generation ids processed by a pool of async workers.
+
+    Each worker opens its own short-lived DB session per job, so no
+    connection is held while the AI service is running. A job only runs once
+    its row is claimed by flipping it from pending to processing, so a row
+    queued twice, or by several server processes, still runs once.
+    """
+
+    def __init__(self, workers: int = GENERATION_WORKERS, maxsize: int = GENERATION_QUEUE_SIZE):
+        self.workers = workers
+        self.maxsize = maxsize
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._batches = set()
+        # Ids this process is running, never released by the stale sweep
+        self._owned: Set[int] = set()
+        self._image_slots: Optional[asyncio.Semaphore] = None
+        self._video_slots: Optional[asyncio.Semaphore] = None
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._image_slots = asyncio.Semaphore(BATCH_IMAGE_CONCURRENCY)
+        self._video_slots = asyncio.Semaphore(BATCH_VIDEO_CONCURRENCY)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        # Re-queue anything left over in the background, recovery can exceed
+        # the queue size so it has to wait for free slots
+        self._tasks.append(asyncio.create_task(self._recover()))
+
+    async def stop(self):
+        tasks = self._tasks + list(self._batches)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._batches.clear()
+
+    def enqueue(self, generation_id: int):
+        """Add a job without waiting, raises QueueFullError when saturated."""
+        try:
+            self._queue.put_nowait(generation_id)
+        except asyncio.QueueFull:
+            raise QueueFullError()
+
+    def batches_full(self) -> bool:
+        return len(self._batches) >= BATCH_MAX_IN_FLIGHT
+
+    def submit_batch(self, user_id: int, jobs: List[BatchJob]):
+        """Run a user's jobs through the batch pipeline, raises QueueFullError when saturated."""
+        if self.batches_full():
+            raise QueueFullError()
+        task = asyncio.create_task(run_batch(user_id, jobs, self._image_slots, self._video_slots, self._owned))
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+
+    def qsize(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def _recover(self):
+        """Queue unclaimed jobs, then keep sweeping for claims whose lease ran out.
+
+        Pending rows may already sit in another process's queue, whichever
+        worker claims first runs them.
+        """
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(models.Generation.id)
+                .filter(models.Generation.status == "pending")
+                .order_by(models.Generation.id)
+            )
+            pending = result.scalars().all()
+        if pending:
+            logger.info("Recovering %d pending generation jobs", len(pending))
+        for generation_id in pending:
+            await self._queue.put(generation_id)
+
+        while True:
+            for generation_id in await self._release_stale():
+                await self._queue.put(generation_id)
+            await asyncio.sleep(GENERATION_LEASE_SECONDS / 2)
+
+    async def _release_stale(self) -> List[int]:
+        cutoff = datetime.utcnow() - timedelta(seconds=GENERATION_LEASE_SECONDS)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(models.Generation)
+                .where(
+                    models.Generation.status == "processing",
+                    (models.Generation.claimed_at == None) | (models.Generation.claimed_at < cutoff),  # noqa: E711
+                    models.Generation.id.not_in(list(self._owned)),
+                )
+                .values(status="pending", claimed_at=None)
+                .returning(models.Generation.id)
+            )
+            released = result.scalars().all()
+            await db.commit()
+        if released:
+            logger.warning("Re-queueing %d generation jobs with expired claims", len(released))
+        return sorted(released)
+
+    async def _claim(self, db, generation_id: int) -> bool:
+        result = await db.execute(
+            update(models.Generation)
+            .where(models.Generation.id == generation_id, models.Generation.status == "pending")
+            .values(status="processing", claimed_at=datetime.utcnow())
+        )
+        await db.commit()
+        return result.rowcount == 1
+
+    async def _worker(self, n: int):
+        while True:
+            generation_id = await self._queue.get()
+            try:
+                with track("job:generation"):
+                    await self._process(generation_id)
+            except Exception:
+                logger.exception("Generation job %s failed", generation_id)
+                try:
+                    await self._set_status(generation_id, "failed")
+                except Exception:
+                    logger.exception("Could not mark generation %s as failed", generation_id)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, generation_id: int):
+        async with AsyncSessionLocal() as db:
+            # Someone else has it, or it already finished
+            if not await self._claim(db, generation_id):
+                return
+            gen = await db.get(models.Generation, generation_id)
+            product = await db.get(models.Product, gen.product_id)
+            prompt = gen.prompt
+        generation_events.publish(product.user_id, generation_event(gen))
+
+        # Call AI Service (Mock) through the result cache without holding a connection
+        owned = {generation_id}
+        self._owned.update(owned)
+        try:
+            async with heartbeat(owned):
+                key = cache_key(prompt, await image_digest(product.image_url))
+                image_url, video_url = await cached_ai_service.generate(prompt, key)
+        finally:
+            self._owned.difference_update(owned)
+
+        async with AsyncSessionLocal() as db:
+            gen = await db.get(models.Generation, generation_id)
+            gen.result_image_url = image_url
+            gen.result_video_url = video_url
+            gen.status = "completed"
+            await db.commit()
+        generation_events.publish(product.user_id, generation_event(gen))
+
+    async def _set_status(self, generation_id: int, status: str):
+        async with AsyncSessionLocal() as db:
+            gen = await db.get(models.Generation, generation_id)
+            if gen is None:
+                return
+            product = await db.get(models.Product, gen.product_id)
+            gen.status = status
+            await db.commit()
+        generation_events.publish(product.user_id, generation_event(gen))
+
+
+@asynccontextmanager
+async def heartbeat(ids: Set[int]):
+    """Renew claimed_at for `ids` every GENERATION_HEARTBEAT_SECONDS while the block runs.
+
+    The set is read on every beat, so callers can drop ids as they finish.
+    """
+    async def beat():
+        while True:
+            await asyncio.sleep(GENERATION_HEARTBEAT_SECONDS)
+            if not ids:
+                continue
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(
+                        update(models.Generation)
+                        .where(models.Generation.id.in_(list(ids)), models.Generation.status == "processing")
+                        .values(claimed_at=datetime.utcnow())
+                    )
+                    await db.commit()
+            except Exception:
+                # The next beat retries, the lease leaves room for a few misses
+                logger.exception("Could not renew claims for %d generation jobs", len(ids))
+
+    task = asyncio.create_task(beat())
+    try:
+        yield
+    finally:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+
+
+async def _flush_results(rows: List[dict]):
+    # One executemany UPDATE keyed on primary key for the whole chunk,
+    # every row carries the same keys so it stays a single statement
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(models.Generation), rows)
+        await db.commit()
+
+
+async def run_batch(
+    user_id: int,
+    jobs: List[BatchJob],
+    image_slots: asyncio.Semaphore,
+    video_slots: asyncio.Semaphore,
+    owned: Set[int],
+    flush_size: int = BATCH_FLUSH_SIZE,
+):
+    """Two stage image -> video pipeline over many generations.
+
+    Image workers feed a bounded hand-off queue that video workers drain, so
+    image N+1 renders while video N encodes. AI calls hold a slot from
+    `image_slots` / `video_slots`, which all batches share. Results are written
+    back in chunks of up to `flush_size`, at least every BATCH_FLUSH_SECONDS,
+    rather than one commit per item. Cached results skip both stages.
+
+    Until its result is written, each claimed id stays in `owned` and has its
+    claim renewed by the heartbeat, so the stale sweep leaves it alone.
+    """
+    if not jobs:
+        return
+    try:
+        await _run_batch(user_id, jobs, image_slots, video_slots, owned, flush_size)
+    finally:
+        owned.difference_update(job.generation_id for job in jobs)
+
+
+async def _run_batch(
+    user_id: int,
+    jobs: List[BatchJob],
+    image_slots: asyncio.Semaphore,
+    video_slots: asyncio.Semaphore,
+    owned: Set[int],
+    flush_size: int,
+):
+    owned.update(job.generation_id for job in jobs)
+    # Claim like the worker pool does, rows another process took are skipped
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(models.Generation)
+            .where(
+                models.Generation.id.in_([job.generation_id for job in jobs]),
+                models.Generation.status == "pending",
+            )
+            .values(status="processing", claimed_at=datetime.utcnow())
+            .returning(models.Generation.id)
+        )
+        claimed = set(result.scalars().all())
+        await db.commit()
+    owned.difference_update(job.generation_id for job in jobs if job.generation_id not in claimed)
+    jobs = [job for job in jobs if job.generation_id in claimed]
+    if not jobs:
+        return
+    unwritten = set(claimed)
+    by_id = {job.generation_id: job for job in jobs}
+    for job in jobs:
+        generation_events.publish(user_id, {
+            "id": job.generation_id, "product_id": job.product_id, "prompt": job.prompt,
+            "status": "processing", "result_image_url": None, "result_video_url": None,
+        })
+
+    todo: asyncio.Queue = asyncio.Queue()
+    images: asyncio.Queue = asyncio.Queue(maxsize=BATCH_VIDEO_CONCURRENCY * 2)
+    results: asyncio.Queue = asyncio.Queue()
+    hits = await cached_ai_service.get_many(job.cache_key for job in jobs)
+    for job in jobs:
+        cached = hits.get(job.cache_key)
+        if cached is not None:
+            results.put_nowait({"id": job.generation_id, "result_image_url": cached[0], "result_video_url": cached[1], "status": "completed"})
+        else:
+            todo.put_nowait((job.generation_id, job.prompt, job.cache_key))
+
+    async def image_stage():
+        while True:
+            try:
+                gid, prompt, key = todo.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                async with image_slots:
+                    image_url = await cached_ai_service.service.generate_image(prompt)
+            except Exception:
+                logger.exception("Batch image generation %s failed", gid)
+                results.put_nowait({"id": gid, "result_image_url": None, "result_video_url": None, "status": "failed"})
+                continue
+            await images.put((gid, key, image_url))
+
+    async def video_stage():
+        while True:
+            item = await images.get()
+            if item is None:
+                return
+            gid, key, image_url = item
+            try:
+                async with video_slots:
+                    video_url = await cached_ai_service.service.generate_video(image_url)
+            except Exception:
+                logger.exception("Batch video generation %s failed", gid)
+                results.put_nowait({"id": gid, "result_image_url": image_url, "result_video_url": None, "status": "failed"})
+                continue
+            results.put_nowait({"id": gid, "result_image_url": image_url, "result_video_url": video_url, "status": "completed"})
+            try:
+                await cached_ai_service.put(key, image_url, video_url)
+            except Exception:
+                logger.exception("Could not cache batch result %s", gid)
+
+    async def writer():
+        loop = asyncio.get_running_loop()
+        pending = []
+        done = 0
+        deadline = None
+        while done < len(jobs):
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
+            try:
+                pending.append(await asyncio.wait_for(results.get(), timeout))
+                done += 1
+                if deadline is None:
+                    deadline = loop.time() + BATCH_FLUSH_SECONDS
+            except asyncio.TimeoutError:
+                pass
+            if pending and (len(pending) >= flush_size or done == len(jobs) or loop.time() >= deadline):
+                await _flush_results(pending)
+                for row in pending:
+                    job = by_id[row["id"]]
+                    unwritten.discard(row["id"])
+                    owned.discard(row["id"])
+                    generation_events.publish(user_id, {**row, "product_id": job.product_id, "prompt": job.prompt})
+                pending = []
+                deadline = None
+
+    video_workers = [asyncio.create_task(video_stage()) for _ in range(BATCH_VIDEO_CONCURRENCY)]
+    writer_task = asyncio.create_task(writer())
+    try:
+        # Rows still waiting for a stage need renewing as much as running ones
+        async with heartbeat(unwritten):
+            await asyncio.gather(*(image_stage() for _ in range(BATCH_IMAGE_CONCURRENCY)))
+            for _ in video_workers:
+                await images.put(None)
+            await asyncio.gather(*video_workers)
+            await writer_task
+    finally:
+        for task in video_workers + [writer_task]:
+            task.cancel()
+
+
+generation_queue = GenerationQueue()
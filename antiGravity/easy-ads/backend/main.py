@@ -1,13 +1,21 @@
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 import os
 
-from database import engine, Base
+from database import engine, pool_metrics
 from routers import auth, users, products, generations
+from jobs import generation_queue
+from uploads import UploadLimitMiddleware, UploadStaticFiles
+from ai_cache import cached_ai_service
+import images
+import metrics
 
 app = FastAPI()
 
+# Reject oversized uploads before the multipart body is parsed
+app.add_middleware(UploadLimitMiddleware)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -20,11 +28,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Per-phase latency histograms, outermost so it sees the whole request
+app.add_middleware(metrics.TimingMiddleware)
+metrics.instrument_engine(engine)
+
 # Mount uploads
 os.makedirs("uploads", exist_ok=True)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.mount("/uploads", UploadStaticFiles(directory="uploads"), name="uploads")
 
 # Include Routers
 app.include_router(auth.router)
@@ -32,7 +45,29 @@ app.include_router(users.router)
 app.include_router(products.router)
 app.include_router(generations.router)
 
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+@app.get("/health/db-pool")
+async def db_pool_health():
+    return pool_metrics.snapshot()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return "\n".join([
+        metrics.phase_seconds.render(),
+        metrics.render_gauges("easyads_db_pool", pool_metrics.snapshot()),
+        metrics.render_gauges("easyads_ai_cache", cached_ai_service.stats()),
+    ]) + "\n"
+
 @app.on_event("startup")
 async def startup():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # Schema is managed by migrations, run `alembic upgrade head` before starting
+    images.start_pool()
+    await generation_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await generation_queue.stop()
+    images.stop_pool()
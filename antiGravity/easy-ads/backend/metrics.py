@@ -0,0 +1,231 @@
+import functools
+import inspect
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Requests slower than this are logged with their phase breakdown, 0 disables
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "0"))
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Prometheus style cumulative histogram keyed by a label tuple."""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, label_values: tuple, value: float):
+        series = self._series.get(label_values)
+        if series is None:
+            # per bucket counts, then sum and count
+            series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, series in sorted(self._series.items()):
+            labels = ",".join(f'{k}="{v}"' for k, v in zip(self.labels, label_values))
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-2]}")
+            lines.append(f"{self.name}_count{{{labels}}} {series[-1]}")
+        return "\n".join(lines)
+
+
+phase_seconds = Histogram(
+    "easyads_request_phase_seconds",
+    "Time per request spent in each phase (total, handler, db, ai, bcrypt, serialization)",
+    ("route", "method", "phase"),
+)
+
+
+class Spans:
+    def __init__(self, route: str, method: str):
+        self.route = route
+        self.method = method
+        self.phases: Dict[str, float] = {}
+        self.handler_end: Optional[float] = None
+
+    def add(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+
+_current: ContextVar[Optional[Spans]] = ContextVar("request_spans", default=None)
+
+
+def record(phase: str, seconds: float):
+    spans = _current.get()
+    if spans is not None:
+        spans.add(phase, seconds)
+    else:
+        # Work outside any request, e.g. the batch pipeline
+        phase_seconds.observe(("background", "-", phase), seconds)
+
+
+@contextmanager
+def timed(phase: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(phase, time.perf_counter() - start)
+
+
+def _finish(spans: Spans, total: float):
+    spans.phases["total"] = total
+    for phase, seconds in spans.phases.items():
+        phase_seconds.observe((spans.route, spans.method, phase), seconds)
+    if SLOW_REQUEST_SECONDS and total >= SLOW_REQUEST_SECONDS:
+        breakdown = " ".join(f"{p}={s * 1000:.1f}ms" for p, s in sorted(spans.phases.items()))
+        logger.warning("Slow request %s %s: %s", spans.method, spans.route, breakdown)
+
+
+@contextmanager
+def track(route: str, method: str = "-"):
+    """Collect spans for a unit of work that isn't an HTTP request, like a queued job."""
+    spans = Spans(route, method)
+    token = _current.set(spans)
+    start = time.perf_counter()
+    try:
+        yield spans
+    finally:
+        _current.reset(token)
+        _finish(spans, time.perf_counter() - start)
+
+
+class TimingMiddleware:
+    """Times each request up to the response start and records its spans.
+
+    Streaming responses such as SSE are measured to their first byte, not for
+    the lifetime of the stream.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        spans = Spans(scope["path"], scope["method"])
+        token = _current.set(spans)
+        start = time.perf_counter()
+        finished = False
+
+        async def timed_send(message):
+            nonlocal finished
+            if message["type"] == "http.response.start" and not finished:
+                finished = True
+                # Label by route template so ids don't explode cardinality
+                route = scope.get("route")
+                spans.route = getattr(route, "path", "unmatched")
+                _finish(spans, time.perf_counter() - start)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            _current.reset(token)
+
+
+def _timed_endpoint(endpoint):
+    # include_router rebuilds routes from the already wrapped endpoint
+    if not inspect.iscoroutinefunction(endpoint) or getattr(endpoint, "_timed", False):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            end = time.perf_counter()
+            record("handler", end - start)
+            spans = _current.get()
+            if spans is not None:
+                spans.handler_end = end
+
+    wrapper._timed = True
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that records endpoint time and response serialization time."""
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            response = await handler(request)
+            spans = _current.get()
+            if spans is not None and spans.handler_end is not None:
+                # Response model validation and JSON encoding happen after the endpoint returns
+                record("serialization", time.perf_counter() - spans.handler_end)
+                spans.handler_end = None
+            return response
+
+        return timed_handler
+
+
+def instrument_engine(engine):
+    """Attribute time spent in SQL statements to the current request."""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        record("db", time.perf_counter() - conn.info["query_start"].pop())
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def _error(context):
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            record("db", time.perf_counter() - starts.pop())
+
+
+class InstrumentedAIService:
+    """Proxy that times calls to an AI service."""
+
+    def __init__(self, service):
+        self.service = service
+
+    async def generate_image(self, prompt: str) -> str:
+        with timed("ai"):
+            return await self.service.generate_image(prompt)
+
+    async def generate_video(self, image_url: str) -> str:
+        with timed("ai"):
+            return await self.service.generate_video(image_url)
+
+
+def render_gauges(prefix: str, values: dict) -> str:
+    lines = []
+    for key, value in values.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            lines.append(f"# TYPE {prefix}_{key} gauge")
+            lines.append(f"{prefix}_{key} {value}")
+    return "\n".join(lines)
@@ -0,0 +1,31 @@
+"""ai result cache table and product image variants
+
+Revision ID: 0002_ai_cache_and_variants
+Revises: 0001_initial
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002_ai_cache_and_variants"
+down_revision = "0001_initial"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "ai_cache",
+        sa.Column("key", sa.String(64), primary_key=True),
+        sa.Column("result_image_url", sa.String(), nullable=True),
+        sa.Column("result_video_url", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_ai_cache_created_at", "ai_cache", ["created_at"])
+    op.add_column("products", sa.Column("image_variants", sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.drop_column("products", "image_variants")
+    op.drop_table("ai_cache")
@@ -0,0 +1,23 @@
+"""composite indexes for keyset pagination of listings
+
+Revision ID: 0003_listing_indexes
+Revises: 0002_ai_cache_and_variants
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+
+revision = "0003_listing_indexes"
+down_revision = "0002_ai_cache_and_variants"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_products_user_id_id", "products", ["user_id", "id"])
+    op.create_index("ix_generations_product_id_id", "generations", ["product_id", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_generations_product_id_id", table_name="generations")
+    op.drop_index("ix_products_user_id_id", table_name="products")
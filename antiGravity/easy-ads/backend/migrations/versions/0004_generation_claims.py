@@ -0,0 +1,24 @@
+"""claim timestamp for generation jobs
+
+Revision ID: 0004_generation_claims
+Revises: 0003_listing_indexes
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004_generation_claims"
+down_revision = "0003_listing_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("generations", sa.Column("claimed_at", sa.DateTime(), nullable=True))
+    op.create_index("ix_generations_status_claimed_at", "generations", ["status", "claimed_at"])
+
+
+def downgrade():
+    op.drop_index("ix_generations_status_claimed_at", table_name="generations")
+    op.drop_column("generations", "claimed_at")
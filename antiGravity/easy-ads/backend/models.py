@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, Boolean, DateTime, JSON, Index
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -18,11 +18,15 @@ class Product(Base):
     name = Column(String, index=True)
     description = Column(Text)
     image_url = Column(String) # URL of the uploaded product image
+    image_variants = Column(JSON, nullable=True) # [{width, format, url}] resized copies
     user_id = Column(Integer, ForeignKey("users.id"))
 
     owner = relationship("User", back_populates="products")
     generations = relationship("Generation", back_populates="product")
 
+    # Keyset pagination of a user's products
+    __table_args__ = (Index("ix_products_user_id_id", "user_id", "id"),)
+
 class Generation(Base):
     __tablename__ = "generations"
 
@@ -31,6 +35,22 @@ class Generation(Base):
     prompt = Column(Text)
     result_image_url = Column(String, nullable=True)
     result_video_url = Column(String, nullable=True)
-    status = Column(String, default="pending") # pending, completed, failed
+    status = Column(String, default="pending") # pending, processing, completed, failed
+    claimed_at = Column(DateTime, nullable=True) # last heartbeat of the worker running the job, stale claims get recovered
 
     product = relationship("Product", back_populates="generations")
+
+    __table_args__ = (
+        # Keyset pagination of a product's generations
+        Index("ix_generations_product_id_id", "product_id", "id"),
+        # Stale claim sweep
+        Index("ix_generations_status_claimed_at", "status", "claimed_at"),
+    )
+
+class AIResultCache(Base):
+    __tablename__ = "ai_cache"
+
+    key = Column(String(64), primary_key=True) # sha256 of normalized prompt + product image
+    result_image_url = Column(String)
+    result_video_url = Column(String)
+    created_at = Column(DateTime, index=True)
@@ -0,0 +1,63 @@
+from typing import List, Literal, Optional
+
+from fastapi import HTTPException, Query
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    """Keyset pagination query params, `cursor` is the last id of the previous page.
+
+    `order=desc` walks newest first, the cursor then bounds ids from above.
+    """
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[int] = Query(None, ge=0, description="Id of the last row on the previous page"),
+        fields: Optional[str] = Query(None, description="Comma separated columns to return, e.g. id,name,image_url"),
+        order: Literal["asc", "desc"] = Query("asc", description="asc for oldest first, desc for newest first"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.fields = fields
+        self.order = order
+
+
+def paginate(query, id_column, page: PageParams):
+    """Apply `id > cursor ORDER BY id LIMIT limit + 1` to a select, or
+    `id < cursor ORDER BY id DESC` for newest first.
+
+    One extra row is fetched to know whether another page exists.
+    """
+    if page.order == "desc":
+        if page.cursor is not None:
+            query = query.filter(id_column < page.cursor)
+        return query.order_by(id_column.desc()).limit(page.limit + 1)
+    if page.cursor is not None:
+        query = query.filter(id_column > page.cursor)
+    return query.order_by(id_column).limit(page.limit + 1)
+
+
+def split_page(rows: list, page: PageParams):
+    """Trim the look-ahead row, returns (rows, next_cursor)."""
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        return rows, rows[-1].id
+    return rows, None
+
+
+def projected_columns(model, page: PageParams, allowed: List[str]):
+    """Columns for a `fields` projection, `id` is always included."""
+    if not page.fields:
+        return None
+    names = [name.strip() for name in page.fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    if "id" not in names:
+        names.insert(0, "id")
+    return [getattr(model, name) for name in names]
@@ -6,14 +6,19 @@ from datetime import timedelta
 
 from database import get_db
 import models, schemas, auth
+from metrics import TimedRoute
 
-router = APIRouter(tags=["Authentication"])
+router = APIRouter(tags=["Authentication"], route_class=TimedRoute)
 
 @router.post("/token", response_model=schemas.Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(models.User).filter(models.User.email == form_data.username))
     user = result.scalars().first()
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+    try:
+        valid = user is not None and await auth.verify_password_async(form_data.password, user.hashed_password)
+    except auth.PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Too many concurrent logins, try again later", headers={"Retry-After": "1"})
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
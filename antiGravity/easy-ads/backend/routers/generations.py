@@ -1,18 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from typing import List
+from typing import List, Optional
 
 from database import get_db
 import models, schemas
-from deps import get_current_user
-from ai_service import ai_service
+from deps import get_current_user, get_current_user_from_query
+from metrics import TimedRoute
+from pagination import PageParams, paginate, split_page, projected_columns, NEXT_CURSOR_HEADER
+from ai_cache import cached_ai_service, cache_key, image_digest
+from jobs import generation_queue, QueueFullError, BatchJob, BATCH_MAX_ITEMS
+from events import generation_events, generation_event, format_sse
 
-router = APIRouter(tags=["Generations"])
+SSE_HEARTBEAT_SECONDS = 15
 
-@router.post("/generate/", response_model=schemas.Generation)
+router = APIRouter(tags=["Generations"], route_class=TimedRoute)
+
+@router.post("/generate/", response_model=schemas.Generation, status_code=status.HTTP_202_ACCEPTED)
 async def generate_ad(
     generation: schemas.GenerationCreate,
+    response: Response,
     current_user: models.User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -22,29 +32,161 @@ async def generate_ad(
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
-    # Create generation record
+    # Same prompt for the same product image, answer from the cache right away
+    key = cache_key(generation.prompt, await image_digest(product.image_url))
+    cached = await cached_ai_service.get(key)
+    if cached is not None:
+        new_gen = models.Generation(
+            product_id=generation.product_id,
+            prompt=generation.prompt,
+            result_image_url=cached[0],
+            result_video_url=cached[1],
+            status="completed"
+        )
+        db.add(new_gen)
+        await db.commit()
+        await db.refresh(new_gen)
+        generation_events.publish(current_user.id, generation_event(new_gen))
+        response.status_code = status.HTTP_201_CREATED
+        return new_gen
+
+    # Reject early instead of piling up rows the workers can't get to
+    if generation_queue.qsize() >= generation_queue.maxsize:
+        raise HTTPException(status_code=503, detail="Generation queue is full, try again later", headers={"Retry-After": "5"})
+
+    # Create generation record, the worker pool picks it up from here
     new_gen = models.Generation(
         product_id=generation.product_id,
         prompt=generation.prompt,
-        status="processing"
+        status="pending"
     )
     db.add(new_gen)
     await db.commit()
-    
-    # Call AI Service (Mock)
-    image_url = await ai_service.generate_image(generation.prompt)
-    video_url = await ai_service.generate_video(image_url)
-    
-    new_gen.result_image_url = image_url
-    new_gen.result_video_url = video_url
-    new_gen.status = "completed"
-    await db.commit()
     await db.refresh(new_gen)
-    
+
+    try:
+        generation_queue.enqueue(new_gen.id)
+    except QueueFullError:
+        # Raced with another request for the last slot
+        new_gen.status = "failed"
+        await db.commit()
+        raise HTTPException(status_code=503, detail="Generation queue is full, try again later", headers={"Retry-After": "5"})
+
+    generation_events.publish(current_user.id, generation_event(new_gen))
     return new_gen
 
+@router.post("/generate/batch/", response_model=List[schemas.Generation], status_code=status.HTTP_202_ACCEPTED)
+async def generate_ads_batch(
+    batch: schemas.GenerationBatchCreate,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    if not batch.items:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    if len(batch.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch is limited to {BATCH_MAX_ITEMS} items")
+
+    # Verify every product belongs to user in one query
+    product_ids = {item.product_id for item in batch.items}
+    result = await db.execute(select(models.Product.id, models.Product.image_url).filter(models.Product.id.in_(product_ids), models.Product.user_id == current_user.id))
+    digests = {pid: await image_digest(url) for pid, url in result.all()}
+    missing = product_ids - set(digests)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Product not found: {sorted(missing)}")
+
+    if generation_queue.batches_full():
+        raise HTTPException(status_code=503, detail="Too many batches in progress, try again later", headers={"Retry-After": "5"})
+
+    # Single flush inserts all rows together
+    new_gens = [
+        models.Generation(product_id=item.product_id, prompt=item.prompt, status="pending")
+        for item in batch.items
+    ]
+    db.add_all(new_gens)
+    await db.commit()
+
+    try:
+        generation_queue.submit_batch(current_user.id, [
+            BatchJob(gen.id, gen.product_id, gen.prompt, cache_key(gen.prompt, digests[gen.product_id]))
+            for gen in new_gens
+        ])
+    except QueueFullError:
+        # Raced with another request for the last slot
+        await db.execute(
+            update(models.Generation)
+            .where(models.Generation.id.in_([gen.id for gen in new_gens]))
+            .values(status="failed")
+        )
+        await db.commit()
+        raise HTTPException(status_code=503, detail="Too many batches in progress, try again later", headers={"Retry-After": "5"})
+    return new_gens
+
+@router.get("/generations/cache/stats")
+async def get_cache_stats(current_user: models.User = Depends(get_current_user)):
+    return cached_ai_service.stats()
+
+@router.get("/generations/job/{generation_id}", response_model=schemas.Generation)
+async def get_generation_job(generation_id: int, current_user: models.User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    result = await db.execute(
+        select(models.Generation)
+        .join(models.Product)
+        .filter(models.Generation.id == generation_id, models.Product.user_id == current_user.id)
+    )
+    gen = result.scalars().first()
+    if not gen:
+        raise HTTPException(status_code=404, detail="Generation not found")
+    return gen
+
+# Must be registered before /generations/{product_id}, which would swallow "events"
+@router.get("/generations/events")
+async def stream_generation_events(
+    request: Request,
+    product_id: Optional[int] = Query(None, description="Only events for this product"),
+    current_user: models.User = Depends(get_current_user_from_query)
+):
+    """Server-sent events for the user's Generation status changes."""
+    subscription = generation_events.subscribe(current_user.id, product_id)
+
+    async def stream():
+        async with subscription:
+            yield ": connected\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": ping\n\n"
+                    continue
+                yield format_sse(event)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+GENERATION_FIELDS = ["id", "prompt", "result_image_url", "result_video_url", "status"]
+
 @router.get("/generations/{product_id}", response_model=List[schemas.Generation])
-async def get_generations(product_id: int, current_user: models.User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(models.Generation).filter(models.Generation.product_id == product_id))
-    generations = result.scalars().all()
+async def get_generations(
+    product_id: int,
+    response: Response,
+    page: PageParams = Depends(),
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    # Keyset pages walk the (product_id, id) index, next page id goes in X-Next-Cursor
+    columns = projected_columns(models.Generation, page, GENERATION_FIELDS)
+    query = select(*columns) if columns else select(models.Generation)
+    query = paginate(query.filter(models.Generation.product_id == product_id), models.Generation.id, page)
+    result = await db.execute(query)
+
+    if columns:
+        rows, next_cursor = split_page(result.all(), page)
+        headers = {NEXT_CURSOR_HEADER: str(next_cursor)} if next_cursor else {}
+        return JSONResponse([dict(row._mapping) for row in rows], headers=headers)
+
+    generations, next_cursor = split_page(result.scalars().all(), page)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = str(next_cursor)
     return generations
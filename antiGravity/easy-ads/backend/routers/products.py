@@ -1,33 +1,37 @@
-from fastapi import APIRouter, Depends, UploadFile, File, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response, UploadFile, File, Form
+from fastapi.responses import JSONResponse, ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func
 from sqlalchemy.future import select
+from sqlalchemy.orm import aliased
 from typing import List
-import shutil
 
 from database import get_db
 import models, schemas
 from deps import get_current_user
+from metrics import TimedRoute
+from pagination import PageParams, paginate, split_page, projected_columns, NEXT_CURSOR_HEADER
+from uploads import save_upload, public_url
+from images import generate_variants
 
 router = APIRouter(
     prefix="/products",
-    tags=["Products"]
+    tags=["Products"],
+    route_class=TimedRoute
 )
 
 @router.post("/", response_model=schemas.Product)
 async def create_product(
+    background_tasks: BackgroundTasks,
     name: str = Form(...),
     description: str = Form(...),
     file: UploadFile = File(...),
     current_user: models.User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    file_location = f"uploads/{file.filename}"
-    with open(file_location, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    # In production, use full URL or relative path handled by frontend
-    # For now, assuming localhost:8000
-    image_url = f"http://localhost:8000/{file_location}"
+    # Stored under its content hash, identical images are written once
+    file_location, digest = await save_upload(file)
+    image_url = public_url(file_location)
     
     new_product = models.Product(
         name=name, 
@@ -38,10 +42,91 @@ async def create_product(
     db.add(new_product)
     await db.commit()
     await db.refresh(new_product)
+
+    # Thumbnails and web variants are built in the process pool after the response
+    background_tasks.add_task(generate_variants, new_product.id, file_location, digest)
     return new_product
 
+PRODUCT_FIELDS = ["id", "name", "description", "image_url", "image_variants", "user_id"]
+
 @router.get("/", response_model=List[schemas.Product])
-async def read_products(current_user: models.User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(models.Product).filter(models.Product.user_id == current_user.id))
-    products = result.scalars().all()
+async def read_products(
+    response: Response,
+    page: PageParams = Depends(),
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    # Keyset pages walk the (user_id, id) index, next page id goes in X-Next-Cursor
+    columns = projected_columns(models.Product, page, PRODUCT_FIELDS)
+    query = select(*columns) if columns else select(models.Product)
+    query = paginate(query.filter(models.Product.user_id == current_user.id), models.Product.id, page)
+    result = await db.execute(query)
+
+    if columns:
+        rows, next_cursor = split_page(result.all(), page)
+        headers = {NEXT_CURSOR_HEADER: str(next_cursor)} if next_cursor else {}
+        return JSONResponse([dict(row._mapping) for row in rows], headers=headers)
+
+    products, next_cursor = split_page(result.scalars().all(), page)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = str(next_cursor)
     return products
+
+@router.get("/dashboard", response_model=List[schemas.ProductSummary])
+async def read_dashboard(
+    page: PageParams = Depends(),
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Products with generation count and latest result, in one query."""
+    # Pick the page of products first so the per-product lookups below only
+    # touch this page, not the user's whole generation history
+    products = paginate(
+        select(
+            models.Product.id,
+            models.Product.name,
+            models.Product.description,
+            models.Product.image_url,
+            models.Product.image_variants,
+        ).filter(models.Product.user_id == current_user.id),
+        models.Product.id,
+        page,
+    ).cte("page_products")
+
+    # Both walk the (product_id, id) index for one product at a time
+    generation_count = (
+        select(func.count())
+        .where(models.Generation.product_id == products.c.id)
+        .scalar_subquery()
+    )
+    latest_id = (
+        select(func.max(models.Generation.id))
+        .where(models.Generation.product_id == products.c.id)
+        .scalar_subquery()
+    )
+    latest = aliased(models.Generation)
+    query = (
+        select(
+            products,
+            generation_count.label("generation_count"),
+            latest.status.label("latest_status"),
+            latest.result_image_url.label("latest_image_url"),
+            latest.result_video_url.label("latest_video_url"),
+        )
+        .outerjoin(latest, latest.id == latest_id)
+        .order_by(products.c.id.desc() if page.order == "desc" else products.c.id)
+    )
+    result = await db.execute(query)
+    rows, next_cursor = split_page(result.all(), page)
+
+    # Plain dicts straight to orjson, skips per-row pydantic validation
+    headers = {NEXT_CURSOR_HEADER: str(next_cursor)} if next_cursor else {}
+    return ORJSONResponse([dict(row._mapping) for row in rows], headers=headers)
+
+@router.get("/{product_id}", response_model=schemas.Product)
+async def read_product(product_id: int, current_user: models.User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(models.Product).filter(models.Product.id == product_id, models.Product.user_id == current_user.id))
+    product = result.scalars().first()
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return product
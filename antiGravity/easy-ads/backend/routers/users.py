@@ -4,10 +4,13 @@ from sqlalchemy.future import select
 
 from database import get_db
 import models, schemas, auth
+from deps import principal_cache
+from metrics import TimedRoute
 
 router = APIRouter(
     prefix="/users",
-    tags=["Users"]
+    tags=["Users"],
+    route_class=TimedRoute
 )
 
 @router.post("/", response_model=schemas.User)
@@ -16,9 +19,14 @@ async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_d
     db_user = result.scalars().first()
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    hashed_password = auth.get_password_hash(user.password)
+    try:
+        hashed_password = await auth.get_password_hash_async(user.password)
+    except auth.PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Too many concurrent signups, try again later", headers={"Retry-After": "1"})
     new_user = models.User(email=user.email, hashed_password=hashed_password)
     db.add(new_user)
     await db.commit()
     await db.refresh(new_user)
+    # Drop any principal cached for a previous account with this email
+    principal_cache.invalidate(new_user.email)
     return new_user
@@ -19,19 +19,39 @@ class ProductBase(BaseModel):
 class ProductCreate(ProductBase):
     pass
 
+class ImageVariant(BaseModel):
+    width: int
+    format: str
+    url: str
+
 class Product(ProductBase):
     id: int
     user_id: int
     image_url: str
+    image_variants: Optional[List[ImageVariant]] = None
     class Config:
         orm_mode = True
 
+class ProductSummary(BaseModel):
+    id: int
+    name: str
+    description: str
+    image_url: str
+    image_variants: Optional[List[ImageVariant]] = None
+    generation_count: int
+    latest_status: Optional[str] = None
+    latest_image_url: Optional[str] = None
+    latest_video_url: Optional[str] = None
+
 class GenerationBase(BaseModel):
     prompt: str
 
 class GenerationCreate(GenerationBase):
     product_id: int
 
+class GenerationBatchCreate(BaseModel):
+    items: List[GenerationCreate]
+
 class Generation(GenerationBase):
     id: int
     result_image_url: Optional[str] = None
@@ -0,0 +1,282 @@
+import asyncio
+import hashlib
+import mimetypes
+import os
+import re
+import uuid
+from typing import Tuple
+
+from fastapi import HTTPException, UploadFile
+from fastapi.staticfiles import StaticFiles
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse
+
+UPLOAD_DIR = "uploads"
+# In production, use full URL or relative path handled by frontend
+# For now, assuming localhost:8000
+PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "http://localhost:8000")
+UPLOAD_CHUNK_SIZE = 256 * 1024
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+
+ALLOWED_IMAGE_TYPES = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+}
+
+# Leading bytes for each allowed type, don't trust the client content type alone
+_MAGIC = {
+    "image/jpeg": (b"\xff\xd8\xff",),
+    "image/png": (b"\x89PNG\r\n\x1a\n",),
+    "image/gif": (b"GIF87a", b"GIF89a"),
+}
+
+
+# Enough leading bytes for every signature above, WEBP needs 12
+_SNIFF_BYTES = 12
+
+
+def _sniff_ok(content_type: str, head: bytes) -> bool:
+    if content_type == "image/webp":
+        return head[:4] == b"RIFF" and head[8:12] == b"WEBP"
+    return any(head.startswith(m) for m in _MAGIC[content_type])
+
+
+def public_url(path: str) -> str:
+    return f"{PUBLIC_BASE_URL}/{path}"
+
+
+def content_path(digest: str, ext: str) -> str:
+    """Content-addressed location, fanned out by the first two hex chars."""
+    return f"{UPLOAD_DIR}/{digest[:2]}/{digest}{ext}"
+
+
+def _finalize(tmp_path: str, final_path: str):
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    if os.path.exists(final_path):
+        # Already stored once, keep the existing copy
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, final_path)
+
+
+async def save_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> Tuple[str, str]:
+    """Stream an uploaded image to disk and return its relative path and sha256.
+
+    Chunks are hashed as they are written and file I/O runs in a thread,
+    so the event loop is never blocked on disk. UploadLimitMiddleware has
+    already checked type and magic bytes while the body arrived, the checks
+    here cover callers that don't go through it.
+    """
+    ext = ALLOWED_IMAGE_TYPES.get(file.content_type)
+    if ext is None:
+        raise HTTPException(status_code=415, detail=f"Unsupported image type: {file.content_type}")
+
+    os.makedirs(os.path.join(UPLOAD_DIR, "tmp"), exist_ok=True)
+    tmp_path = os.path.join(UPLOAD_DIR, "tmp", uuid.uuid4().hex)
+    digest = hashlib.sha256()
+    size = 0
+    out = await asyncio.to_thread(open, tmp_path, "wb")
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            if size == 0 and not _sniff_ok(file.content_type, chunk):
+                raise HTTPException(status_code=415, detail="File content does not match its image type")
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(status_code=413, detail=f"Image exceeds {max_bytes} bytes")
+            digest.update(chunk)
+            await asyncio.to_thread(out.write, chunk)
+    except BaseException:
+        await asyncio.to_thread(out.close)
+        await asyncio.to_thread(os.remove, tmp_path)
+        raise
+    await asyncio.to_thread(out.close)
+
+    if size == 0:
+        await asyncio.to_thread(os.remove, tmp_path)
+        raise HTTPException(status_code=400, detail="Empty file")
+
+    final_path = content_path(digest.hexdigest(), ext)
+    await asyncio.to_thread(_finalize, tmp_path, final_path)
+    return final_path, digest.hexdigest()
+
+
+class _ImagePartCheck:
+    """Checks the file parts of a multipart body as its chunks arrive.
+
+    Every part with a filename must declare an allowed image type and start
+    with that type's magic bytes. `error` holds the first violation.
+    """
+
+    def __init__(self, boundary: bytes):
+        self.error = None
+        self._headers = {}
+        self._field = b""
+        self._value = b""
+        self._content_type = None
+        self._head = b""
+        self.parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def feed(self, chunk: bytes):
+        if self.error is None and self.parser is not None and chunk:
+            try:
+                self.parser.write(chunk)
+            except Exception:
+                # Malformed body, the form parser reports it with a 400
+                self.parser = None
+
+    def _on_part_begin(self):
+        self._headers = {}
+        self._content_type = None
+        self._head = b""
+
+    def _on_header_field(self, data, start, end):
+        self._field += data[start:end]
+
+    def _on_header_value(self, data, start, end):
+        self._value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._field.lower()] = self._value
+        self._field = self._value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if b"filename" not in options:
+            return
+        content_type = self._headers.get(b"content-type", b"").decode("latin-1").strip()
+        if content_type not in ALLOWED_IMAGE_TYPES:
+            self.error = f"Unsupported image type: {content_type or None}"
+            return
+        self._content_type = content_type
+
+    def _on_part_data(self, data, start, end):
+        if self._content_type and len(self._head) < _SNIFF_BYTES:
+            self._head += data[start:min(end, start + _SNIFF_BYTES - len(self._head))]
+            if len(self._head) >= _SNIFF_BYTES:
+                self._check_head()
+
+    def _on_part_end(self):
+        # Short files, empty ones are left to save_upload
+        if self._content_type and 0 < len(self._head) < _SNIFF_BYTES:
+            self._check_head()
+
+    def _check_head(self):
+        if not _sniff_ok(self._content_type, self._head):
+            self.error = "File content does not match its image type"
+        self._content_type = None
+
+
+class UploadLimitMiddleware:
+    """Reject oversized or non-image uploads before the body is parsed.
+
+    Requests announcing a larger Content-Length get a 413 straight away,
+    chunked bodies are cut off as soon as they cross the limit. File parts
+    of multipart bodies are checked as they stream in, so a non-image is
+    refused with a 415 after its first chunk rather than after the form
+    parser has spooled all of it.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_UPLOAD_BYTES, overhead: int = 64 * 1024):
+        self.app = app
+        self.limit = max_bytes + overhead  # room for the other form fields
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "PATCH"):
+            return await self.app(scope, receive, send)
+
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > self.limit:
+                await send({"type": "http.response.start", "status": 413, "headers": [(b"content-type", b"application/json")]})
+                await send({"type": "http.response.body", "body": b'{"detail":"Request body too large"}'})
+                return
+
+        check = None
+        for name, value in scope["headers"]:
+            if name == b"content-type":
+                content_type, options = parse_options_header(value)
+                if content_type == b"multipart/form-data" and b"boundary" in options:
+                    check = _ImagePartCheck(options[b"boundary"])
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                received += len(body)
+                if received > self.limit:
+                    raise HTTPException(status_code=413, detail="Request body too large")
+                if check is not None:
+                    check.feed(body)
+                    if check.error:
+                        raise HTTPException(status_code=415, detail=check.error)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+# <sha256>.<ext> originals and <sha256>-<width>.<ext> variants never change
+_CONTENT_ADDRESSED_NAME = re.compile(r"^([0-9a-f]{64}(?:-\d+)?)\.\w+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+class UploadStaticFiles(StaticFiles):
+    """StaticFiles for uploads/ with caching tuned for content-addressed names.
+
+    Hashed files get a year long immutable Cache-Control and a strong ETag
+    taken from the hash, so revalidation ends in a 304. A `.br`/`.gz`
+    sibling is served instead when the client accepts it. Byte ranges
+    (video seeking) are handled by FileResponse.
+    """
+
+    def lookup_path(self, path):
+        # In-flight uploads are never served
+        if path.split("/", 1)[0] == "tmp":
+            return "", None
+        return super().lookup_path(path)
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        request_headers = Headers(scope=scope)
+        media_type = mimetypes.guess_type(str(full_path))[0] or "application/octet-stream"
+        headers = {"vary": "Accept-Encoding"}
+
+        path, encoding = full_path, None
+        accepted = request_headers.get("accept-encoding", "")
+        for name, suffix in PRECOMPRESSED:
+            candidate = f"{full_path}{suffix}"
+            if name in accepted and os.path.isfile(candidate):
+                path, encoding = candidate, name
+                stat_result = os.stat(candidate)
+                headers["content-encoding"] = name
+                break
+
+        match = _CONTENT_ADDRESSED_NAME.match(os.path.basename(str(full_path)))
+        if match:
+            tag = match.group(1) + (f"-{encoding}" if encoding else "")
+            headers["etag"] = f'"{tag}"'
+            headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+        else:
+            # Legacy name based uploads can change under the same URL
+            headers["cache-control"] = "no-cache"
+
+        response = FileResponse(path, status_code=status_code, stat_result=stat_result, headers=headers, media_type=media_type)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
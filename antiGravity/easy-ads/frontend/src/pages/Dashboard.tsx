@@ -10,22 +10,34 @@ interface Product {
     id: number;
     name: string;
     image_url: string;
+    image_variants?: { width: number; format: string; url: string }[] | null;
     description: string;
+    generation_count: number;
+    latest_status: string | null;
 }
 
+// Let the browser pick the smallest resized copy that fits
+const srcSet = (product: Product) =>
+    product.image_variants
+        ?.filter((v) => v.format === 'webp')
+        .map((v) => `${v.url} ${v.width}w`)
+        .join(', ');
+
 const Dashboard: React.FC = () => {
     const [products, setProducts] = useState<Product[]>([]);
     const [loading, setLoading] = useState(true);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
     const navigate = useNavigate();
 
     useEffect(() => {
         fetchProducts();
     }, []);
 
-    const fetchProducts = async () => {
+    const fetchProducts = async (cursor?: string) => {
         try {
-            const response = await api.get('/products/');
-            setProducts(response.data);
+            const response = await api.get('/products/dashboard', { params: cursor ? { cursor } : {} });
+            setProducts((prev) => (cursor ? [...prev, ...response.data] : response.data));
+            setNextCursor(response.headers['x-next-cursor'] ?? null);
         } catch (error) {
             console.error('Failed to fetch products', error);
         } finally {
@@ -111,6 +123,8 @@ const Dashboard: React.FC = () => {
                                     <div className="aspect-square relative overflow-hidden">
                                         <img
                                             src={product.image_url}
+                                            srcSet={srcSet(product)}
+                                            sizes="(min-width: 1024px) 25vw, (min-width: 768px) 33vw, 100vw"
                                             alt={product.name}
                                             className="w-full h-full object-cover group-hover:scale-110 transition-transform duration-700"
                                         />
@@ -121,12 +135,22 @@ const Dashboard: React.FC = () => {
                                     <div className="p-5 bg-black/40 backdrop-blur-md">
                                         <h3 className="font-bold text-lg truncate mb-1">{product.name}</h3>
                                         <p className="text-gray-400 text-sm truncate">{product.description}</p>
+                                        <p className="text-gray-500 text-xs mt-2">
+                                            {product.generation_count} ads{product.latest_status ? ` · latest ${product.latest_status}` : ''}
+                                        </p>
                                     </div>
                                 </Card>
                             </motion.div>
                         ))}
                     </motion.div>
                 )}
+                {nextCursor && (
+                    <div className="flex justify-center mt-10">
+                        <Button variant="outline" onClick={() => fetchProducts(nextCursor)}>
+                            Load more
+                        </Button>
+                    </div>
+                )}
             </div>
         </div>
     );
@@ -18,6 +18,7 @@ interface Product {
     id: number;
     name: string;
     image_url: string;
+    image_variants?: { width: number; format: string; url: string }[] | null;
     description: string;
 }
 
@@ -26,6 +27,7 @@ const ProductView: React.FC = () => {
     const navigate = useNavigate();
     const [product, setProduct] = useState<Product | null>(null);
     const [generations, setGenerations] = useState<Generation[]>([]);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
     const [prompt, setPrompt] = useState('');
     const [generating, setGenerating] = useState(false);
 
@@ -33,15 +35,44 @@ const ProductView: React.FC = () => {
         fetchData();
     }, [id]);
 
+    // Status changes are pushed by the server instead of re-fetching the list
+    useEffect(() => {
+        const token = localStorage.getItem('token');
+        if (!token) return;
+        const source = new EventSource(
+            `${api.defaults.baseURL}/generations/events?product_id=${id}&token=${encodeURIComponent(token)}`
+        );
+        source.addEventListener('generation', (e) => {
+            const gen: Generation = JSON.parse((e as MessageEvent).data);
+            setGenerations((prev) =>
+                prev.some((g) => g.id === gen.id)
+                    ? prev.map((g) => (g.id === gen.id ? { ...g, ...gen } : g))
+                    : [gen, ...prev]
+            );
+        });
+        return () => source.close();
+    }, [id]);
+
     const fetchData = async () => {
         try {
             const [prodRes, genRes] = await Promise.all([
-                api.get('/products/'),
-                api.get(`/generations/${id}`)
+                api.get(`/products/${id}`),
+                api.get(`/generations/${id}`, { params: { order: 'desc' } })
             ]);
-            const currentProd = prodRes.data.find((p: Product) => p.id === Number(id));
-            setProduct(currentProd);
+            setProduct(prodRes.data);
             setGenerations(genRes.data);
+            setNextCursor(genRes.headers['x-next-cursor'] ?? null);
+        } catch (error) {
+            console.error('Fetch failed', error);
+        }
+    };
+
+    // Newest first, older pages are appended below
+    const fetchOlder = async (cursor: string) => {
+        try {
+            const response = await api.get(`/generations/${id}`, { params: { order: 'desc', cursor } });
+            setGenerations((prev) => [...prev, ...response.data.filter((gen: Generation) => !prev.some((g) => g.id === gen.id))]);
+            setNextCursor(response.headers['x-next-cursor'] ?? null);
         } catch (error) {
             console.error('Fetch failed', error);
         }
@@ -51,12 +82,12 @@ const ProductView: React.FC = () => {
         e.preventDefault();
         setGenerating(true);
         try {
+            // Runs in the background, progress arrives over the event stream
             await api.post('/generate/', {
                 product_id: Number(id),
                 prompt
             });
             setPrompt('');
-            fetchData();
         } catch (error) {
             console.error('Generation failed', error);
         } finally {
@@ -89,7 +120,13 @@ const ProductView: React.FC = () => {
                         className="lg:col-span-1 space-y-8"
                     >
                         <Card className="p-0 overflow-hidden">
-                            <img src={product.image_url} alt={product.name} className="w-full aspect-square object-cover" />
+                            <img
+                                src={product.image_url}
+                                srcSet={product.image_variants?.filter((v) => v.format === 'webp').map((v) => `${v.url} ${v.width}w`).join(', ')}
+                                sizes="(min-width: 1024px) 33vw, 100vw"
+                                alt={product.name}
+                                className="w-full aspect-square object-cover"
+                            />
                             <div className="p-6 bg-black/40 backdrop-blur-md">
                                 <h1 className="text-2xl font-bold mb-2">{product.name}</h1>
                                 <p className="text-gray-400">{product.description}</p>
@@ -193,6 +230,14 @@ const ProductView: React.FC = () => {
                                 ))}
                             </AnimatePresence>
 
+                            {nextCursor && (
+                                <div className="flex justify-center">
+                                    <Button variant="outline" onClick={() => fetchOlder(nextCursor)}>
+                                        Load more
+                                    </Button>
+                                </div>
+                            )}
+
                             {generations.length === 0 && (
                                 <motion.div
                                     initial={{ opacity: 0 }}
@@ -0,0 +1,142 @@
+"""Throughput and tail latency of the trending service against the local fake API.
+
+Boots fake_youtube.app and main.app under uvicorn in this process, points the
+service at the fake and runs three scenarios:
+
+    cold      the trending cache is cleared before every request
+    warm      keyword queries against an already cached pool
+    fallback  keywords that match nothing, forcing search + details calls
+
+    python benchmarks/bench_trending.py --requests 500 --concurrency 32 --latency-ms 80
+
+Needs uvicorn and httpx, both already project dependencies.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def configure(args):
+    """Environment for the service and the fake, must run before importing them."""
+    os.environ["YOUTUBE_API_BASE_URL"] = f"http://127.0.0.1:{args.fake_port}"
+    os.environ["YOUTUBE_API_KEY"] = "bench"
+    os.environ["SNAPSHOT_REGIONS"] = ""
+    os.environ["SNAPSHOT_DB"] = ":memory:"
+    # The fake costs nothing, don't let the budget throttle the run
+    os.environ["YOUTUBE_DAILY_QUOTA"] = str(10 ** 9)
+    os.environ["FAKE_YOUTUBE_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["FAKE_YOUTUBE_JITTER_MS"] = str(args.jitter_ms)
+    os.environ["FAKE_YOUTUBE_ERROR_RATE"] = str(args.error_rate)
+    sys.path.insert(0, SERVICE_DIR)
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def cold(client, main):
+    main.trending_cache.clear()
+    return await client.get("/trending-videos", params={"region": "IN", "max_results": 20})
+
+
+async def warm(client, main):
+    keyword = random.choice(["music", "live cricket", "news", "gaming review", "trailer"])
+    return await client.get("/trending-videos", params={"region": "IN", "keyword": keyword, "match": "any"})
+
+
+async def fallback(client, main):
+    # Unique keywords miss both the pool and the search cache
+    keyword = f"zz{uuid.uuid4().hex[:10]}"
+    return await client.get("/trending-videos", params={"region": "IN", "keyword": keyword, "fallback_search": True})
+
+
+SCENARIOS = {"cold": cold, "warm": warm, "fallback": fallback}
+
+
+async def run_scenario(name, client, main, requests, concurrency):
+    latencies, errors = [], {}
+    remaining = [requests]
+
+    async def worker():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            start = time.perf_counter()
+            response = await SCENARIOS[name](client, main)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors[response.status_code] = errors.get(response.status_code, 0) + 1
+
+    # Prime the pool so warm and fallback measure the cached path
+    await client.get("/trending-videos", params={"region": "IN"})
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+async def main(args):
+    import httpx
+    import uvicorn
+    import fake_youtube
+    import main as service
+
+    servers = [
+        uvicorn.Server(uvicorn.Config(fake_youtube.app, host="127.0.0.1", port=args.fake_port, log_level="warning")),
+        uvicorn.Server(uvicorn.Config(service.app, host="127.0.0.1", port=args.port, log_level="warning")),
+    ]
+    tasks = [asyncio.create_task(server.serve()) for server in servers]
+    while not all(server.started for server in servers):
+        await asyncio.sleep(0.05)
+
+    results = {}
+    limits = httpx.Limits(max_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=60) as client:
+            for name in args.scenarios:
+                results[name] = await run_scenario(name, client, service, args.requests, args.concurrency)
+    finally:
+        for server in servers:
+            server.should_exit = True
+        await asyncio.gather(*tasks)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--fake-port", type=int, default=8767)
+    parser.add_argument("--requests", type=int, default=300, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--latency-ms", type=float, default=50, help="fake API latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake API calls that fail")
+    parser.add_argument("--output", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    configure(args)
+    results = asyncio.run(main(args))
+
+    print(f"{'scenario':<10} {'req':>6} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  errors")
+    for name, r in results.items():
+        print(f"{name:<10} {r['requests']:>6} {r['rps']:>9.1f} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f}  {r['errors'] or ''}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
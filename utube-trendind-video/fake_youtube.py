@@ -0,0 +1,160 @@
+"""Local stand-in for the YouTube Data API `videos` and `search` endpoints.
+
+Responses are replayed from JSON fixtures keyed by resource and query
+parameters (the API key is ignored). A request without a fixture is either
+recorded from the real API when FAKE_YOUTUBE_RECORD_FROM is set, or answered
+with deterministic synthetic data: a 200 video chart per region, paged like
+the real one.
+
+    uvicorn fake_youtube:app --port 9000
+    YOUTUBE_API_BASE_URL=http://127.0.0.1:9000 uvicorn main:app
+
+FAKE_YOUTUBE_LATENCY_MS / FAKE_YOUTUBE_JITTER_MS delay every response and
+FAKE_YOUTUBE_ERROR_RATE makes that fraction of calls fail, half with a 500
+and half with a 403 quotaExceeded error.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import random
+from typing import Optional
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+FIXTURES_DIR = os.getenv("FAKE_YOUTUBE_FIXTURES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures"))
+# Upstream to record missing fixtures from, e.g. https://www.googleapis.com/youtube/v3
+RECORD_FROM = os.getenv("FAKE_YOUTUBE_RECORD_FROM")
+LATENCY_MS = float(os.getenv("FAKE_YOUTUBE_LATENCY_MS", "0"))
+JITTER_MS = float(os.getenv("FAKE_YOUTUBE_JITTER_MS", "0"))
+ERROR_RATE = float(os.getenv("FAKE_YOUTUBE_ERROR_RATE", "0"))
+
+CHART_SIZE = 200
+WORDS = [
+    "music", "live", "cricket", "highlights", "trailer", "official", "news", "gaming",
+    "comedy", "recipe", "vlog", "football", "review", "tech", "podcast", "remix",
+]
+
+app = FastAPI()
+
+
+def fixture_path(resource: str, params: dict) -> str:
+    relevant = {k: v for k, v in sorted(params.items()) if k != "key"}
+    digest = hashlib.sha1(json.dumps(relevant, sort_keys=True).encode()).hexdigest()[:16]
+    return os.path.join(FIXTURES_DIR, f"{resource}-{digest}.json")
+
+
+def token_offset(token: Optional[str]) -> int:
+    """Offset encoded in a page token (field 1 varint), 0 when absent or unreadable."""
+    if not token:
+        return 0
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except ValueError:
+        return 0
+    offset, shift = 0, 0
+    for byte in raw[1:]:
+        offset |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            break
+    return offset
+
+
+def page_token(offset: int) -> str:
+    varint = bytearray()
+    while True:
+        byte, offset = offset & 0x7F, offset >> 7
+        varint.append(byte | 0x80 if offset else byte)
+        if not offset:
+            break
+    return base64.urlsafe_b64encode(b"\x08" + bytes(varint) + b"\x10\x00").decode().rstrip("=")
+
+
+def synthetic_video(video_id: str) -> dict:
+    rng = random.Random(video_id)
+    title = " ".join(rng.sample(WORDS, 3)).title()
+    views = rng.randint(10_000, 50_000_000)
+    return {
+        "kind": "youtube#video",
+        "id": video_id,
+        "snippet": {
+            "publishedAt": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T12:00:00Z",
+            "title": f"{title} {video_id}",
+            "description": " ".join(rng.choices(WORDS, k=12)),
+            "channelTitle": f"{rng.choice(WORDS).title()} Channel",
+            "thumbnails": {"default": {"url": f"https://i.ytimg.com/vi/{video_id}/default.jpg", "width": 120, "height": 90}},
+        },
+        "contentDetails": {"duration": f"PT{rng.randint(0, 2)}H{rng.randint(0, 59)}M{rng.randint(0, 59)}S"},
+        "statistics": {
+            "viewCount": str(views),
+            "likeCount": str(views // rng.randint(20, 100)),
+            "commentCount": str(views // rng.randint(500, 2000)),
+        },
+    }
+
+
+def synthetic(resource: str, params: dict) -> dict:
+    if resource == "search":
+        q = params.get("q", "")
+        count = min(int(params.get("maxResults", 5)), 50)
+        seed = hashlib.sha1(q.encode()).hexdigest()[:6]
+        return {
+            "kind": "youtube#searchListResponse",
+            "items": [{"kind": "youtube#searchResult", "id": {"kind": "youtube#video", "videoId": f"s{seed}{i}"}} for i in range(count)],
+        }
+    if params.get("id"):
+        return {"kind": "youtube#videoListResponse", "items": [synthetic_video(v) for v in params["id"].split(",")]}
+
+    region = params.get("regionCode", "US").upper()
+    size = min(int(params.get("maxResults", 5)), 50)
+    offset = token_offset(params.get("pageToken"))
+    end = min(offset + size, CHART_SIZE)
+    body = {
+        "kind": "youtube#videoListResponse",
+        "items": [synthetic_video(f"{region}{i:03d}") for i in range(offset, end)],
+        "pageInfo": {"totalResults": CHART_SIZE, "resultsPerPage": size},
+    }
+    if end < CHART_SIZE:
+        body["nextPageToken"] = page_token(end)
+    return body
+
+
+async def respond(resource: str, request: Request) -> JSONResponse:
+    if LATENCY_MS or JITTER_MS:
+        await asyncio.sleep(max(0.0, LATENCY_MS + random.uniform(-JITTER_MS, JITTER_MS)) / 1000)
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        if random.random() < 0.5:
+            return JSONResponse(status_code=500, content={"error": {"code": 500, "message": "Backend Error"}})
+        return JSONResponse(status_code=403, content={"error": {"code": 403, "message": "quotaExceeded",
+                                                                 "errors": [{"reason": "quotaExceeded"}]}})
+
+    params = dict(request.query_params)
+    path = fixture_path(resource, params)
+    if os.path.exists(path):
+        with open(path) as f:
+            return JSONResponse(json.load(f))
+
+    if RECORD_FROM:
+        async with httpx.AsyncClient(timeout=10) as client:
+            upstream = await client.get(f"{RECORD_FROM.rstrip('/')}/{resource}", params=params)
+        if upstream.status_code == 200:
+            os.makedirs(FIXTURES_DIR, exist_ok=True)
+            with open(path, "w") as f:
+                json.dump(upstream.json(), f)
+        return JSONResponse(status_code=upstream.status_code, content=upstream.json())
+
+    return JSONResponse(synthetic(resource, params))
+
+
+@app.get("/videos")
+async def videos(request: Request):
+    return await respond("videos", request)
+
+
+@app.get("/search")
+async def search(request: Request):
+    return await respond("search", request)
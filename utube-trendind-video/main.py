@@ -1,11 +1,105 @@
-from fastapi import FastAPI, HTTPException, Query
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
+import asyncio
+import base64
+import csv
+import importlib.util
+import io
+import json
+import logging
 import os
-import requests
-from typing import List, Optional
+import re
+import time
+import unicodedata
+import httpx
+from typing import Awaitable, Callable, Dict, Iterable, List, Literal, Optional, Set, Tuple
 from dotenv import load_dotenv
+import quota
+import snapshots
 load_dotenv()
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+# Point at fake_youtube.py for load tests that shouldn't touch Google
+YOUTUBE_API_BASE_URL = os.getenv("YOUTUBE_API_BASE_URL", "https://www.googleapis.com/youtube/v3").rstrip("/")
+VIDEOS_URL = f"{YOUTUBE_API_BASE_URL}/videos"
+SEARCH_URL = f"{YOUTUBE_API_BASE_URL}/search"
+
+# One pooled client for every YouTube call, HTTP/2 when the h2 package is installed
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "60"))
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+# Regions whose pools are snapshotted for the history endpoints, empty disables it
+SNAPSHOT_REGIONS = [r.strip().upper() for r in os.getenv("SNAPSHOT_REGIONS", "IN").split(",") if r.strip()]
+SNAPSHOT_INTERVAL = float(os.getenv("SNAPSHOT_INTERVAL", "900"))
+SNAPSHOT_RETENTION_DAYS = float(os.getenv("SNAPSHOT_RETENTION_DAYS", "30"))
+SNAPSHOT_DB = os.getenv("SNAPSHOT_DB", "snapshots.sqlite3")
+
+# Daily Data API quota and the share of it fallback searches may use
+YOUTUBE_DAILY_QUOTA = int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000"))
+QUOTA_SEARCH_SHARE = float(os.getenv("QUOTA_SEARCH_SHARE", "0.5"))
+# Hours of steady spend a call type may use in one go
+QUOTA_BURST_HOURS = float(os.getenv("QUOTA_BURST_HOURS", "1"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "3600"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.http = httpx.AsyncClient(
+        http2=HTTP2,
+        timeout=10,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_SECONDS,
+        ),
+    )
+    app.state.details = quota.DetailsBatcher(
+        lambda ids: fetch_video_details(app.state.http, ids, get_api_key())
+    )
+    app.state.snapshots = snapshots.SnapshotStore(SNAPSHOT_DB, SNAPSHOT_RETENTION_DAYS * 86400)
+    snapshotter = None
+    if SNAPSHOT_REGIONS and os.getenv("YOUTUBE_API_KEY"):
+        snapshotter = asyncio.create_task(snapshot_loop(app.state.http, app.state.snapshots))
+    yield
+    if snapshotter:
+        snapshotter.cancel()
+    await app.state.http.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
+
+quota_budget = quota.QuotaBudget(
+    YOUTUBE_DAILY_QUOTA,
+    {"videos.list": 1 - QUOTA_SEARCH_SHARE, "search.list": QUOTA_SEARCH_SHARE},
+    burst_hours=QUOTA_BURST_HOURS,
+)
+search_cache = quota.SearchCache(SEARCH_CACHE_TTL)
+
+
+@app.exception_handler(quota.QuotaExhausted)
+async def quota_exhausted_handler(request: Request, exc: quota.QuotaExhausted):
+    # Only reached when there is nothing cached to degrade to
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(int(exc.retry_after) + 1)},
+    )
+
+# The mostPopular chart only changes every few minutes, so each region's pool is cached
+TRENDING_CACHE_TTL = float(os.getenv("TRENDING_CACHE_TTL", "300"))
+# Past the TTL a pool is still served for this long while one background refresh runs
+TRENDING_CACHE_MAX_STALE = float(os.getenv("TRENDING_CACHE_MAX_STALE", "3600"))
+
+# videos.list returns at most 50 items per page and the chart holds up to 200
+TRENDING_PAGE_SIZE = 50
+TRENDING_POOL_SIZE = int(os.getenv("TRENDING_POOL_SIZE", "200"))
+
+# Regions fetched at once by the batch endpoint, and how many one call may ask for
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_REGIONS = 50
 
 
 class TrendingResponseVideo(BaseModel):
@@ -28,124 +122,589 @@ def safe_int(x):
         return None
 
 
-def matches_keyword(snippet: dict, keyword: str) -> bool:
-    """Simple case-insensitive substring match against title, description and channelTitle."""
-    if not keyword:
-        return True
-    kw = keyword.lower()
-    title = (snippet.get("title") or "").lower()
-    desc = (snippet.get("description") or "").lower()
-    channel = (snippet.get("channelTitle") or "").lower()
-    return kw in title or kw in desc or kw in channel
+# Relevance of a keyword hit by the field it appears in
+FIELD_WEIGHTS = {"title": 3.0, "channelTitle": 2.0, "description": 1.0}
+TOKEN_RE = re.compile(r"\w+")
+# Index grams, keyword terms shorter than this are checked against every item
+NGRAM = 3
 
 
-@app.get("/trending-videos", response_model=dict)
-def get_trending_videos(
-    region: str = Query("IN", min_length=2, max_length=2, description="ISO 3166-1 alpha-2 country code"),
-    max_results: int = Query(10, ge=1, le=10, description="Number of videos to return (1-10)"),
-    keyword: Optional[str] = Query(None, description="Optional keyword/topic to filter trending videos"),
-    fallback_search: bool = Query(False, description="If true and no trending match, return search results for keyword")
-):
+def normalize(text: str) -> str:
+    """Casefold and strip accents so "Café" matches "cafe"."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return TOKEN_RE.findall(normalize(text)) if text else []
+
+
+class TrendingPool:
+    """A region's trending items plus a trigram index over them.
+
+    Built once per fetch so requests only check the items holding every
+    trigram of a keyword. Keywords match anywhere in title, channelTitle and
+    description, so "phone" finds "iPhone" and text written without spaces
+    (Japanese, Thai, ...) still matches.
     """
-    If `keyword` is provided, returns trending videos (mostPopular) that match the keyword.
-    If none match and `fallback_search` is True, performs a search for the keyword and returns those results.
+
+    def __init__(self, items: list):
+        self.items = items
+        self.views = [safe_int(it.get("statistics", {}).get("viewCount")) or 0 for it in items]
+        # Normalized (text, weight) per field of each item
+        self.fields: List[List[Tuple[str, float]]] = []
+        self.grams: Dict[str, Set[int]] = {}
+        for doc, it in enumerate(items):
+            snippet = it.get("snippet", {})
+            fields = [(normalize(snippet.get(field) or ""), weight) for field, weight in FIELD_WEIGHTS.items()]
+            self.fields.append(fields)
+            grams = set()
+            for text, _ in fields:
+                grams.update(text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1))
+            for gram in grams:
+                self.grams.setdefault(gram, set()).add(doc)
+        self.ranks = {it.get("id"): rank for rank, it in enumerate(items, start=1)}
+
+    def _candidates(self, term: str) -> Iterable[int]:
+        if len(term) < NGRAM:
+            return range(len(self.items))
+        postings = [self.grams.get(term[i:i + NGRAM]) for i in range(len(term) - NGRAM + 1)]
+        if not all(postings):
+            return ()
+        postings.sort(key=len)
+        return postings[0].intersection(*postings[1:])
+
+    def _term_scores(self, term: str) -> Dict[int, float]:
+        """Summed weight of the fields containing term, per item."""
+        scores: Dict[int, float] = {}
+        for doc in self._candidates(term):
+            # Sharing every trigram doesn't mean the term is there
+            weight = sum(w for text, w in self.fields[doc] if term in text)
+            if weight:
+                scores[doc] = weight
+        return scores
+
+    def search(self, keyword: Optional[str], match: str = "all") -> list:
+        """Items matching all (or any) keyword terms, best matches and most viewed first."""
+        terms = list(dict.fromkeys(tokenize(keyword)))
+        if not terms:
+            return self.items
+        per_term = [self._term_scores(term) for term in terms]
+        if match == "all":
+            docs = set(per_term[0]).intersection(*per_term[1:])
+        else:
+            docs = set().union(*per_term)
+        # Ties fall back to views, then chart position
+        ranked = sorted(docs, key=lambda d: (-sum(s.get(d, 0.0) for s in per_term), -self.views[d], d))
+        return [self.items[d] for d in ranked]
+
+
+class TrendingCache:
+    """Per-region cache of the trending pool with stale-while-revalidate.
+
+    A fresh entry is returned as is. A stale one is returned immediately while a
+    single background task refreshes it. Only a missing (or too old) entry makes
+    the caller wait, and concurrent callers for the same region share that fetch.
     """
-    api_key = os.getenv("YOUTUBE_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="YOUTUBE_API_KEY not found in environment variables")
 
-    # Step 1: fetch trending (mostPopular)
-    videos_url = "https://www.googleapis.com/youtube/v3/videos"
+    def __init__(self, ttl: float, max_stale: float):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._entries: Dict[str, Tuple[float, TrendingPool]] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def get(self, region: str, fetch: Callable[[], Awaitable[TrendingPool]]) -> TrendingPool:
+        entry = self._entries.get(region)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < self.ttl:
+                return entry[1]
+            if age < self.ttl + self.max_stale:
+                if region not in self._refreshing:
+                    self._refreshing[region] = asyncio.create_task(self._refresh(region, fetch))
+                return entry[1]
+
+        task = self._inflight.get(region)
+        if task is None:
+            task = self._inflight[region] = asyncio.create_task(self._fill(region, fetch))
+        try:
+            # A disconnecting client must not cancel the fetch other callers wait on
+            return await asyncio.shield(task)
+        except (HTTPException, quota.QuotaExhausted) as exc:
+            if entry is None:
+                raise
+            # An old pool beats an error when the API or the quota budget fails us
+            logger.warning("Serving expired trending pool for %s: %s", region, exc)
+            return entry[1]
+
+    def put(self, region: str, pool: TrendingPool):
+        self._entries[region] = (time.monotonic(), pool)
+
+    def clear(self):
+        self._entries.clear()
+
+    async def _fill(self, region: str, fetch: Callable[[], Awaitable[TrendingPool]]) -> TrendingPool:
+        try:
+            pool = await fetch()
+            self._entries[region] = (time.monotonic(), pool)
+            return pool
+        finally:
+            del self._inflight[region]
+
+    async def _refresh(self, region: str, fetch: Callable[[], Awaitable[TrendingPool]]):
+        try:
+            self._entries[region] = (time.monotonic(), await fetch())
+        except Exception as exc:
+            # Keep serving the stale pool, the next request past the TTL retries
+            logger.warning("Refreshing trending pool for %s failed: %s", region, exc)
+        finally:
+            del self._refreshing[region]
+
+
+trending_cache = TrendingCache(TRENDING_CACHE_TTL, TRENDING_CACHE_MAX_STALE)
+
+
+async def youtube_get(client: httpx.AsyncClient, url: str, params: dict, error: str, call: str = "videos.list") -> dict:
+    """GET a YouTube API resource, turning transport and HTTP errors into a 502.
+
+    The call is charged to its quota budget first and raises QuotaExhausted
+    without reaching the API when the budget is spent.
+    """
+    quota_budget.spend(call)
+    try:
+        resp = await client.get(url, params=params)
+        resp.raise_for_status()
+    except httpx.HTTPError as exc:
+        raise HTTPException(status_code=502, detail=f"{error}: {exc}")
+    return resp.json()
+
+
+def page_token(offset: int) -> str:
+    """Page token for a result offset, in the encoding YouTube uses for nextPageToken."""
+    varint = bytearray()
+    while True:
+        byte, offset = offset & 0x7F, offset >> 7
+        varint.append(byte | 0x80 if offset else byte)
+        if not offset:
+            break
+    return base64.urlsafe_b64encode(b"\x08" + bytes(varint) + b"\x10\x00").decode().rstrip("=")
+
+
+async def fetch_trending_pool(client: httpx.AsyncClient, region: str, api_key: str) -> list:
+    """Fetch the whole mostPopular chart for a region from the YouTube API.
+
+    The first page tells us how many entries the chart has, the remaining pages
+    are then requested concurrently.
+    """
     params = {
         "part": "snippet,contentDetails,statistics",
         "chart": "mostPopular",
-        "regionCode": region.upper(),
-        "maxResults": 10,  # fetch full pool (we'll limit later to max_results)
+        "regionCode": region,
+        "maxResults": min(TRENDING_PAGE_SIZE, TRENDING_POOL_SIZE),
         "key": api_key
     }
+    error = "Error fetching trending videos from YouTube API"
+    first = await youtube_get(client, VIDEOS_URL, params, error)
+    items = first.get("items", [])
+    total = min(first.get("pageInfo", {}).get("totalResults", len(items)), TRENDING_POOL_SIZE)
+    if not first.get("nextPageToken") or len(items) >= total:
+        return items[:TRENDING_POOL_SIZE]
 
+    offsets = range(len(items), total, params["maxResults"])
     try:
-        resp = requests.get(videos_url, params=params, timeout=10)
-        resp.raise_for_status()
-    except requests.RequestException as exc:
-        raise HTTPException(status_code=502, detail=f"Error fetching trending videos from YouTube API: {exc}")
+        pages = await asyncio.gather(*(
+            youtube_get(client, VIDEOS_URL, {**params, "pageToken": page_token(offset)}, error)
+            for offset in offsets
+        ))
+    except HTTPException:
+        # Page tokens are officially opaque, if ours are rejected walk nextPageToken instead
+        logger.warning("Concurrent page fetch for %s failed, paging sequentially", region)
+        pages, token = [], first.get("nextPageToken")
+        while token and len(items) + sum(len(p.get("items", [])) for p in pages) < total:
+            page = await youtube_get(client, VIDEOS_URL, {**params, "pageToken": token}, error)
+            pages.append(page)
+            token = page.get("nextPageToken")
 
-    items = resp.json().get("items", [])
+    for page in pages:
+        items.extend(page.get("items", []))
+    return items[:TRENDING_POOL_SIZE]
 
-    # If keyword is provided, filter the trending list
-    if keyword:
-        filtered = [it for it in items if matches_keyword(it.get("snippet", {}), keyword)]
-    else:
-        filtered = items
 
-    # If nothing matched and fallback_search is requested, perform a search
-    if keyword and not filtered and fallback_search:
+async def trending_pool(client: httpx.AsyncClient, region: str, api_key: str) -> TrendingPool:
+    """The cached, indexed trending pool for a region, fetching it on a miss."""
+    async def load() -> TrendingPool:
+        items = await fetch_trending_pool(client, region, api_key)
+        # Indexing long descriptions takes a while, keep it off the event loop
+        return await asyncio.to_thread(TrendingPool, items)
+
+    return await trending_cache.get(region, load)
+
+
+def video_summary(it: dict) -> dict:
+    vid_id = it.get("id")
+    snippet = it.get("snippet", {})
+    stats = it.get("statistics", {})
+    content = it.get("contentDetails", {})
+    return {
+        "id": vid_id,
+        "title": snippet.get("title"),
+        "channelTitle": snippet.get("channelTitle"),
+        "publishedAt": snippet.get("publishedAt"),
+        "duration": content.get("duration"),
+        "viewCount": safe_int(stats.get("viewCount")),
+        "likeCount": safe_int(stats.get("likeCount")),
+        "commentCount": safe_int(stats.get("commentCount")),
+        "thumbnails": snippet.get("thumbnails", {}),
+        "url": f"https://www.youtube.com/watch?v={vid_id}"
+    }
+
+
+ISO_DURATION_RE = re.compile(r"^P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+
+
+def duration_seconds(duration: Optional[str]) -> Optional[int]:
+    """Seconds in an ISO-8601 duration such as PT1H2M3S, None if unparseable."""
+    match = ISO_DURATION_RE.match(duration or "")
+    if not match or duration.endswith(("P", "T")):
+        return None
+    weeks, days, hours, minutes, seconds = (int(g or 0) for g in match.groups())
+    return (((weeks * 7 + days) * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+EXPORT_FIELDS = [
+    "region", "rank", "id", "title", "channelTitle", "publishedAt", "duration", "durationSeconds",
+    "viewCount", "likeCount", "commentCount", "url",
+]
+
+# Only filled on the row of a region that failed
+CSV_FIELDS = EXPORT_FIELDS + ["error"]
+
+
+def export_row(region: str, rank: Optional[int], it: dict) -> dict:
+    video = video_summary(it)
+    return {
+        "region": region,
+        "rank": rank,
+        "id": video["id"],
+        "title": video["title"],
+        "channelTitle": video["channelTitle"],
+        "publishedAt": video["publishedAt"],
+        "duration": video["duration"],
+        "durationSeconds": duration_seconds(video["duration"]),
+        "viewCount": video["viewCount"],
+        "likeCount": video["likeCount"],
+        "commentCount": video["commentCount"],
+        "url": video["url"],
+    }
+
+
+async def fetch_video_details(client: httpx.AsyncClient, ids: List[str], api_key: str) -> list:
+    """One videos.list call for up to 50 ids, callers go through the DetailsBatcher."""
+    data = await youtube_get(
+        client,
+        VIDEOS_URL,
+        {
+            "part": "snippet,contentDetails,statistics",
+            "id": ",".join(ids),
+            "key": api_key
+        },
+        "Error fetching video details for search results"
+    )
+    return data.get("items", [])
+
+
+async def search_videos(request: Request, keyword: str, max_results: int, api_key: str) -> list:
+    """Fallback search: ids from search.list (cached per keyword), then batched details."""
+    limit = min(max_results, 5)  # search API maxResults is 50 but keep it conservative
+    cache_key = f"{' '.join(tokenize(keyword))}|{limit}"
+
+    async def search() -> List[str]:
         # perform search (search.list) to get relevant videos for the keyword
-        search_url = "https://www.googleapis.com/youtube/v3/search"
         search_params = {
             "part": "snippet",
             "q": keyword,
             "type": "video",
-            "maxResults": min(max_results, 5),  # search API maxResults is 50 but keep it conservative
+            "maxResults": limit,
             "key": api_key
         }
-        try:
-            sres = requests.get(search_url, params=search_params, timeout=10)
-            sres.raise_for_status()
-        except requests.RequestException as exc:
-            raise HTTPException(status_code=502, detail=f"Error performing fallback search: {exc}")
+        sres = await youtube_get(request.app.state.http, SEARCH_URL, search_params,
+                                 "Error performing fallback search", call="search.list")
+        search_items = sres.get("items", [])
+        return [item["id"]["videoId"] for item in search_items if item.get("id", {}).get("videoId")]
+
+    video_ids = await search_cache.get_or_fetch(cache_key, search)
+    if not video_ids:
+        return []
+    # fetch full details for these IDs, merged with other requests' lookups
+    return await request.app.state.details.get(video_ids)
+
+
+def get_api_key() -> str:
+    api_key = os.getenv("YOUTUBE_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="YOUTUBE_API_KEY not found in environment variables")
+    return api_key
+
+
+def encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(f"o:{offset}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        prefix, offset = base64.urlsafe_b64decode(cursor.encode()).decode().split(":", 1)
+        if prefix != "o" or int(offset) < 0:
+            raise ValueError(cursor)
+        return int(offset)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-        search_items = sres.json().get("items", [])
-        video_ids = [item["id"]["videoId"] for item in search_items if item.get("id", {}).get("videoId")]
-        if not video_ids:
-            return {"region": region.upper(), "keyword": keyword, "videos": []}
 
-        # fetch full details for these IDs
+@app.get("/trending-videos", response_model=dict)
+async def get_trending_videos(
+    request: Request,
+    region: str = Query("IN", min_length=2, max_length=2, description="ISO 3166-1 alpha-2 country code"),
+    max_results: int = Query(10, ge=1, le=50, description="Number of videos to return (1-50)"),
+    keyword: Optional[str] = Query(None, description="Optional keywords to filter and rank trending videos"),
+    match: Literal["all", "any"] = Query("all", description="Require all keywords or any of them"),
+    fallback_search: bool = Query(False, description="If true and no trending match, return search results for keyword"),
+    offset: int = Query(0, ge=0, description="Skip this many matching videos"),
+    cursor: Optional[str] = Query(None, description="next_cursor from a previous page, overrides offset")
+):
+    """
+    If `keyword` is provided, returns trending videos (mostPopular) that match the keywords,
+    case and accent insensitive and ranked by where they matched and by view count.
+    If none match and `fallback_search` is True, performs a search for the keyword and returns those results.
+    Results are paged with `offset` or the returned `next_cursor`.
+    """
+    if cursor:
+        offset = decode_cursor(cursor)
+
+    api_key = get_api_key()
+
+    # Step 1: trending (mostPopular) pool, served from the per-region cache
+    client = request.app.state.http
+    pool = await trending_pool(client, region.upper(), api_key)
+
+    # If keyword is provided, filter the trending list through the pool's index
+    filtered = pool.search(keyword, match)
+
+    # If nothing matched and fallback_search is requested, perform a search
+    fallback_used = False
+    degraded = False
+    if keyword and not filtered and fallback_search:
         try:
-            det_res = requests.get(
-                videos_url,
-                params={
-                    "part": "snippet,contentDetails,statistics",
-                    "id": ",".join(video_ids),
-                    "key": api_key
-                },
-                timeout=10
-            )
-            det_res.raise_for_status()
-        except requests.RequestException as exc:
-            raise HTTPException(status_code=502, detail=f"Error fetching video details for search results: {exc}")
-
-        items = det_res.json().get("items", [])
-        filtered = items
-
-    # Limit final results to user's max_results (the API call fetched up to 50 trending items earlier)
-    filtered = filtered[:max_results]
-
-    # Build response
-    videos = []
-    for it in filtered:
-        vid_id = it.get("id")
-        snippet = it.get("snippet", {})
-        stats = it.get("statistics", {})
-        content = it.get("contentDetails", {})
-
-        videos.append({
-            "id": vid_id,
-            "title": snippet.get("title"),
-            "channelTitle": snippet.get("channelTitle"),
-            "publishedAt": snippet.get("publishedAt"),
-            "duration": content.get("duration"),
-            "viewCount": safe_int(stats.get("viewCount")),
-            "likeCount": safe_int(stats.get("likeCount")),
-            "commentCount": safe_int(stats.get("commentCount")),
-            "thumbnails": snippet.get("thumbnails", {}),
-            "url": f"https://www.youtube.com/watch?v={vid_id}"
-        })
+            filtered = await search_videos(request, keyword, max_results, api_key)
+            fallback_used = True
+        except (HTTPException, quota.QuotaExhausted) as exc:
+            # Answer with the (empty) trending matches rather than an error
+            logger.warning("Fallback search for %r skipped: %s", keyword, getattr(exc, "detail", exc))
+            degraded = True
+
+    # Page through the matches, the pool holds the whole chart
+    total_matches = len(filtered)
+    next_offset = offset + max_results
+    filtered = filtered[offset:next_offset]
+
+    videos = [video_summary(it) for it in filtered]
 
     return {
         "region": region.upper(),
         "requested_maxResults": max_results,
         "keyword": keyword,
-        "fallback_search_used": bool(keyword and not filtered and fallback_search),
+        "fallback_search_used": fallback_used,
+        "degraded": degraded,
+        "offset": offset,
+        "total_matches": total_matches,
+        "next_cursor": encode_cursor(next_offset) if next_offset < total_matches else None,
         "videos": videos
     }
+
+
+def parse_regions(regions: List[str]) -> List[str]:
+    codes = list(dict.fromkeys(code.strip().upper() for entry in regions for code in entry.split(",") if code.strip()))
+    if not codes or len(codes) > BATCH_MAX_REGIONS or any(len(code) != 2 for code in codes):
+        raise HTTPException(status_code=422, detail=f"regions must be 1-{BATCH_MAX_REGIONS} two letter country codes")
+    return codes
+
+
+@app.get("/trending-videos/batch")
+async def get_trending_videos_batch(
+    request: Request,
+    regions: List[str] = Query(..., description="Region codes, repeated or comma separated"),
+    max_results: int = Query(10, ge=1, le=50, description="Number of videos per region (1-50)"),
+    keyword: Optional[str] = Query(None, description="Optional keywords to filter and rank trending videos"),
+    match: Literal["all", "any"] = Query("all", description="Require all keywords or any of them")
+):
+    """
+    Trending videos for many regions at once, streamed as NDJSON with one line per
+    region in the order they finish. A failing region yields an `error` line
+    instead of failing the whole response.
+    """
+    codes = parse_regions(regions)
+    api_key = get_api_key()
+    client = request.app.state.http
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def region_result(code: str) -> dict:
+        try:
+            async with semaphore:
+                pool = await trending_pool(client, code, api_key)
+        except HTTPException as exc:
+            return {"region": code, "error": exc.detail}
+        except quota.QuotaExhausted as exc:
+            return {"region": code, "error": str(exc)}
+        filtered = pool.search(keyword, match)
+        return {
+            "region": code,
+            "keyword": keyword,
+            "total_matches": len(filtered),
+            "videos": [video_summary(it) for it in filtered[:max_results]]
+        }
+
+    async def lines():
+        tasks = [asyncio.create_task(region_result(code)) for code in codes]
+        try:
+            for done in asyncio.as_completed(tasks):
+                yield json.dumps(await done) + "\n"
+        finally:
+            # Client went away, stop fetching the remaining regions
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.get("/trending-videos/export")
+async def export_trending_videos(
+    request: Request,
+    regions: List[str] = Query(..., description="Region codes, repeated or comma separated"),
+    keyword: Optional[str] = Query(None, description="Optional keywords to filter trending videos"),
+    match: Literal["all", "any"] = Query("all", description="Require all keywords or any of them"),
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="Output format")
+):
+    """
+    Stream the trending pools of several regions as flat rows, one per video, with the
+    duration also given in seconds. Rows are written as each region's pool arrives.
+    A failing region yields a row holding only its region and an `error`, the CSV
+    gets an extra error column for it.
+    """
+    codes = parse_regions(regions)
+    api_key = get_api_key()
+    client = request.app.state.http
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def region_pool(code: str):
+        try:
+            async with semaphore:
+                return code, await trending_pool(client, code, api_key)
+        except (HTTPException, quota.QuotaExhausted) as exc:
+            return code, exc
+
+    def csv_line(values) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(values)
+        return buffer.getvalue()
+
+    async def rows():
+        if format == "csv":
+            yield csv_line(CSV_FIELDS)
+        tasks = [asyncio.create_task(region_pool(code)) for code in codes]
+        try:
+            for done in asyncio.as_completed(tasks):
+                code, pool = await done
+                if isinstance(pool, Exception):
+                    error = getattr(pool, "detail", None) or str(pool)
+                    logger.warning("Export skipped region %s: %s", code, error)
+                    region_rows = [{"region": code, "error": error}]
+                else:
+                    # Rows are built one at a time, the pool itself is shared with the cache
+                    region_rows = (export_row(code, pool.ranks.get(it.get("id")), it) for it in pool.search(keyword, match))
+                for row in region_rows:
+                    if format == "csv":
+                        yield csv_line(row.get(field) for field in CSV_FIELDS)
+                    else:
+                        yield json.dumps(row) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(rows(), media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="trending.{format}"'
+    })
+
+
+@app.get("/quota", response_model=dict)
+async def get_quota():
+    """Remaining quota budget and spend per YouTube API call type."""
+    return {
+        "daily_quota": YOUTUBE_DAILY_QUOTA,
+        "resets_in_seconds": int(quota.seconds_until_quota_reset()),
+        "calls": quota_budget.stats(),
+    }
+
+
+def snapshot_rows(items: list) -> List[snapshots.SnapshotRow]:
+    rows = []
+    for rank, it in enumerate(items, start=1):
+        stats = it.get("statistics", {})
+        rows.append((
+            it.get("id"),
+            rank,
+            safe_int(stats.get("viewCount")),
+            safe_int(stats.get("likeCount")),
+            safe_int(stats.get("commentCount")),
+        ))
+    return rows
+
+
+async def snapshot_loop(client: httpx.AsyncClient, store: snapshots.SnapshotStore):
+    """Store every SNAPSHOT_INTERVAL seconds a freshly fetched pool for each region."""
+    api_key = os.getenv("YOUTUBE_API_KEY")
+    while True:
+        for region in SNAPSHOT_REGIONS:
+            try:
+                # Fetched directly rather than through the cache so timestamps match the data,
+                # the fresh pool then replaces the cached one
+                pool = await asyncio.to_thread(TrendingPool, await fetch_trending_pool(client, region, api_key))
+                trending_cache.put(region, pool)
+                await asyncio.to_thread(store.write, region, snapshot_rows(pool.items))
+            except Exception as exc:
+                logger.warning("Snapshot of %s failed: %s", region, exc)
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+
+
+async def trending_history(request: Request, region: str, window_hours: float, key: str, limit: int) -> dict:
+    store = request.app.state.snapshots
+    since = int(time.time() - window_hours * 3600)
+    columns = await asyncio.to_thread(store.load, region.upper(), since)
+    return {
+        "region": region.upper(),
+        "window_hours": window_hours,
+        "snapshots": int(len(set(columns["taken_at"].tolist()))),
+        "videos": snapshots.top(snapshots.window_stats(columns), key, limit)
+    }
+
+
+@app.get("/trending-videos/velocity", response_model=dict)
+async def get_view_velocity(
+    request: Request,
+    region: str = Query("IN", min_length=2, max_length=2, description="ISO 3166-1 alpha-2 country code"),
+    window_hours: float = Query(24, gt=0, description="How far back to compare snapshots"),
+    limit: int = Query(20, ge=1, le=200, description="Number of videos to return")
+):
+    """Currently trending videos gaining views fastest over the window, from stored snapshots."""
+    return await trending_history(request, region, window_hours, "views_per_hour", limit)
+
+
+@app.get("/trending-videos/risers", response_model=dict)
+async def get_top_risers(
+    request: Request,
+    region: str = Query("IN", min_length=2, max_length=2, description="ISO 3166-1 alpha-2 country code"),
+    window_hours: float = Query(24, gt=0, description="How far back to compare snapshots"),
+    limit: int = Query(20, ge=1, le=200, description="Number of videos to return")
+):
+    """Currently trending videos that climbed the most chart positions over the window."""
+    return await trending_history(request, region, window_hours, "rank_delta", limit)
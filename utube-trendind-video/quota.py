@@ -0,0 +1,231 @@
+"""Keeping YouTube Data API quota spend in check.
+
+Every call type gets a share of the daily quota. Its spend is capped per
+quota day, which like YouTube's resets at midnight Pacific time, and paced by
+a token bucket refilled evenly over the day that holds at most `burst_hours`
+of refill, so a busy hour can't use up the whole day. Detail lookups from concurrent
+requests are merged into single videos.list calls, and search results are
+cached by keyword so repeated fallbacks don't pay for search.list again.
+"""
+import asyncio
+import datetime
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+# Units charged per call, see https://developers.google.com/youtube/v3/determine_quota_cost
+QUOTA_COSTS = {"videos.list": 1, "search.list": 100}
+
+# YouTube resets daily quota at midnight Pacific time
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+# videos.list accepts at most 50 ids
+MAX_IDS_PER_CALL = 50
+
+
+class QuotaExhausted(Exception):
+    def __init__(self, call: str, retry_after: float):
+        super().__init__(f"{call} quota budget exhausted, retry in {retry_after:.0f}s")
+        self.call = call
+        self.retry_after = retry_after
+
+
+def quota_day(now: Optional[float] = None) -> datetime.date:
+    return datetime.datetime.fromtimestamp(time.time() if now is None else now, QUOTA_TIMEZONE).date()
+
+
+def seconds_until_quota_reset(now: Optional[float] = None) -> float:
+    now = time.time() if now is None else now
+    today = datetime.datetime.fromtimestamp(now, QUOTA_TIMEZONE)
+    midnight = datetime.datetime.combine(today.date() + datetime.timedelta(days=1), datetime.time(), QUOTA_TIMEZONE)
+    return max(0.0, midnight.timestamp() - now)
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def try_take(self, amount: float) -> bool:
+        self._refill()
+        if self.tokens < amount:
+            return False
+        self.tokens -= amount
+        return True
+
+    def seconds_until(self, amount: float) -> float:
+        self._refill()
+        missing = amount - self.tokens
+        if missing <= 0:
+            return 0.0
+        return missing / self.refill_per_second if self.refill_per_second else float("inf")
+
+
+class QuotaBudget:
+    """Per call type budgets carved out of the daily quota.
+
+    Spend is counted per process, a restart starts a fresh day count but
+    only a `burst_hours` bucket.
+    """
+
+    def __init__(self, daily_units: int, shares: Dict[str, float], burst_hours: float = 1.0):
+        self.daily = {call: daily_units * share for call, share in shares.items()}
+        self.buckets = {
+            # Never smaller than one call, or the call could never go through
+            call: TokenBucket(max(units * burst_hours / 24, QUOTA_COSTS[call]), units / 86400)
+            for call, units in self.daily.items()
+        }
+        self.day = quota_day()
+        self.spent_today = dict.fromkeys(shares, 0)
+        self.spent = dict.fromkeys(shares, 0)
+        self.rejected = dict.fromkeys(shares, 0)
+
+    def _roll_day(self):
+        today = quota_day()
+        if today != self.day:
+            self.day = today
+            self.spent_today = dict.fromkeys(self.spent_today, 0)
+
+    def spend(self, call: str):
+        """Charge one call, raising QuotaExhausted when its budget can't cover it."""
+        self._roll_day()
+        cost = QUOTA_COSTS[call]
+        bucket = self.buckets[call]
+        if self.spent_today[call] + cost > self.daily[call]:
+            self.rejected[call] += 1
+            raise QuotaExhausted(call, seconds_until_quota_reset())
+        if not bucket.try_take(cost):
+            self.rejected[call] += 1
+            raise QuotaExhausted(call, bucket.seconds_until(cost))
+        self.spent_today[call] += cost
+        self.spent[call] += cost
+
+    def stats(self) -> dict:
+        self._roll_day()
+        return {
+            call: {
+                "cost": QUOTA_COSTS[call],
+                "available": int(min(bucket.tokens, self.daily[call] - self.spent_today[call])),
+                "capacity": int(bucket.capacity),
+                "daily": int(self.daily[call]),
+                "spent_today": self.spent_today[call],
+                "spent": self.spent[call],
+                "rejected": self.rejected[call],
+            }
+            for call, bucket in self.buckets.items()
+        }
+
+
+class DetailsBatcher:
+    """Merges concurrent videos.list?id= lookups into calls of up to 50 ids.
+
+    Ids requested within `delay` seconds of each other share a call; a batch is
+    sent right away once it reaches 50 ids.
+    """
+
+    def __init__(self, fetch: Callable[[List[str]], Awaitable[list]], delay: float = 0.01):
+        self.fetch = fetch
+        self.delay = delay
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._timer: Optional[asyncio.Task] = None
+        self._tasks: set = set()
+
+    async def get(self, ids: List[str]) -> List[dict]:
+        """Details for the ids in the given order, unknown ids are left out."""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for vid in dict.fromkeys(ids):
+            future = self._pending.get(vid)
+            if future is None:
+                future = self._pending[vid] = loop.create_future()
+            futures.append(future)
+
+        if len(self._pending) >= MAX_IDS_PER_CALL:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._spawn(self._flush())
+        elif self._timer is None:
+            self._timer = self._spawn(self._flush_later())
+
+        # Shielded so one cancelled caller doesn't cancel lookups others share
+        results = await asyncio.gather(*(asyncio.shield(f) for f in futures))
+        return [item for item in results if item is not None]
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.delay)
+        await self._flush()
+
+    async def _flush(self):
+        self._timer = None
+        pending, self._pending = self._pending, {}
+        ids = list(pending)
+        await asyncio.gather(*(
+            self._call(ids[i:i + MAX_IDS_PER_CALL], pending)
+            for i in range(0, len(ids), MAX_IDS_PER_CALL)
+        ))
+
+    async def _call(self, ids: List[str], pending: Dict[str, asyncio.Future]):
+        try:
+            items = await self.fetch(ids)
+        except Exception as exc:
+            for vid in ids:
+                pending[vid].set_exception(exc)
+            return
+        by_id = {it.get("id"): it for it in items}
+        for vid in ids:
+            pending[vid].set_result(by_id.get(vid))
+
+
+class SearchCache:
+    """Video ids returned by search.list, keyed by normalized query.
+
+    Concurrent misses for the same query share one search call.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: Dict[str, Tuple[float, List[str]]] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def get_or_fetch(self, query: str, fetch: Callable[[], Awaitable[List[str]]]) -> List[str]:
+        ids = self.get(query)
+        if ids is not None:
+            return ids
+        task = self._inflight.get(query)
+        if task is None:
+            task = self._inflight[query] = asyncio.create_task(self._fill(query, fetch))
+        return await asyncio.shield(task)
+
+    async def _fill(self, query: str, fetch: Callable[[], Awaitable[List[str]]]) -> List[str]:
+        try:
+            ids = await fetch()
+            self.put(query, ids)
+            return ids
+        finally:
+            del self._inflight[query]
+
+    def get(self, query: str) -> Optional[List[str]]:
+        entry = self._entries.get(query)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return None
+        return entry[1]
+
+    def put(self, query: str, ids: List[str]):
+        if len(self._entries) >= self.maxsize:
+            # Drop the oldest entry, dicts keep insertion order
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[query] = (time.monotonic(), ids)
@@ -0,0 +1,151 @@
+"""Historical snapshots of the trending pools and the analytics over them.
+
+Each snapshot stores one row per video (rank and counters) for a region at a
+point in time. Analytics load a region's rows for a time window into NumPy
+arrays and compute per-video deltas without looping in Python.
+"""
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    region TEXT NOT NULL,
+    taken_at INTEGER NOT NULL,
+    video_id TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    view_count INTEGER,
+    like_count INTEGER,
+    comment_count INTEGER,
+    PRIMARY KEY (region, taken_at, video_id)
+) WITHOUT ROWID
+"""
+
+# (video_id, rank, viewCount, likeCount, commentCount)
+SnapshotRow = Tuple[str, int, Optional[int], Optional[int], Optional[int]]
+
+
+class SnapshotStore:
+    """SQLite backed store, all methods are blocking and meant for a worker thread."""
+
+    def __init__(self, path: str, retention_seconds: float):
+        self.path = path
+        self.retention_seconds = retention_seconds
+        with self._connect() as conn:
+            conn.execute(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def write(self, region: str, rows: Iterable[SnapshotRow], taken_at: Optional[int] = None):
+        taken_at = int(taken_at if taken_at is not None else time.time())
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((region, taken_at, *row) for row in rows),
+            )
+            conn.execute(
+                "DELETE FROM snapshots WHERE region = ? AND taken_at < ?",
+                (region, taken_at - self.retention_seconds),
+            )
+
+    def load(self, region: str, since: int) -> dict:
+        """Column arrays for a region's rows since a timestamp, ordered by video then time."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT video_id, taken_at, rank, view_count, like_count, comment_count "
+                "FROM snapshots WHERE region = ? AND taken_at >= ? ORDER BY video_id, taken_at",
+                (region, since),
+            ).fetchall()
+        columns = list(zip(*rows)) or [()] * 6
+        return {
+            "video_id": np.array(columns[0], dtype=object),
+            "taken_at": np.array(columns[1], dtype=np.int64),
+            "rank": np.array(columns[2], dtype=np.int64),
+            # Missing counters (hidden likes, disabled comments) become NaN
+            "views": np.array(columns[3], dtype=np.float64),
+            "likes": np.array(columns[4], dtype=np.float64),
+            "comments": np.array(columns[5], dtype=np.float64),
+        }
+
+
+def _nan_to_none(values: np.ndarray, cast=int) -> list:
+    return [None if np.isnan(v) else cast(v) for v in values]
+
+
+def window_stats(columns: dict) -> dict:
+    """Per-video first/last observation deltas over the loaded window.
+
+    Rows arrive grouped by video and sorted by time, so each video's first and
+    last observation are the edges of its group.
+    """
+    ids, first, counts = np.unique(columns["video_id"], return_index=True, return_counts=True)
+    if not len(ids):
+        return {"video_id": ids, "latest": np.array([], dtype=bool)}
+    last = first + counts - 1
+    taken_at = columns["taken_at"]
+    hours = (taken_at[last] - taken_at[first]) / 3600.0
+    views_delta = columns["views"][last] - columns["views"][first]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        views_per_hour = np.where(hours > 0, views_delta / hours, np.nan)
+    return {
+        "video_id": ids,
+        "first_seen": taken_at[first],
+        "last_seen": taken_at[last],
+        # Only videos in the newest snapshot are still trending
+        "latest": taken_at[last] == taken_at.max(),
+        "rank": columns["rank"][last],
+        # Positive when the video climbed the chart
+        "rank_delta": columns["rank"][first] - columns["rank"][last],
+        "views": columns["views"][last],
+        "views_delta": views_delta,
+        "views_per_hour": views_per_hour,
+        "likes_delta": columns["likes"][last] - columns["likes"][first],
+        "comments_delta": columns["comments"][last] - columns["comments"][first],
+    }
+
+
+def top(stats: dict, key: str, limit: int) -> List[dict]:
+    """Rows for the currently trending videos with the highest `key`."""
+    if not stats["latest"].any():
+        return []
+    idx = np.flatnonzero(stats["latest"])
+    values = stats[key][idx].astype(np.float64)
+    # Sorting -values ascending gives descending order, NaN goes to +inf so it comes last
+    order = idx[np.argsort(np.where(np.isnan(values), np.inf, -values), kind="stable")][:limit]
+    return [
+        {
+            "id": vid,
+            "rank": int(rank),
+            "rank_delta": int(rank_delta),
+            "views": views,
+            "views_delta": views_delta,
+            "views_per_hour": views_per_hour,
+            "likes_delta": likes_delta,
+            "comments_delta": comments_delta,
+            "first_seen": int(first_seen),
+            "last_seen": int(last_seen),
+        }
+        for vid, rank, rank_delta, views, views_delta, views_per_hour, likes_delta, comments_delta, first_seen, last_seen in zip(
+            stats["video_id"][order],
+            stats["rank"][order],
+            stats["rank_delta"][order],
+            _nan_to_none(stats["views"][order]),
+            _nan_to_none(stats["views_delta"][order]),
+            _nan_to_none(stats["views_per_hour"][order], lambda v: round(float(v), 2)),
+            _nan_to_none(stats["likes_delta"][order]),
+            _nan_to_none(stats["comments_delta"][order]),
+            stats["first_seen"][order],
+            stats["last_seen"][order],
+        )
+    ]
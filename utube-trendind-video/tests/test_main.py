@@ -0,0 +1,124 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import fake_youtube
+import main
+import quota
+from main import TrendingPool, duration_seconds, page_token
+
+
+def video(vid, title, channel="", description="", views=0):
+    return {
+        "id": vid,
+        "snippet": {"title": title, "channelTitle": channel, "description": description},
+        "statistics": {"viewCount": str(views)},
+    }
+
+
+@pytest.fixture
+def pool():
+    return TrendingPool([
+        video("jp", "東京オリンピック ハイライト", views=500),
+        video("phone", "iPhone 16 review", channel="Tech Corner", views=300),
+        video("cafe", "Café music for studying", description="lofi beats", views=100),
+        video("news", "Evening news", channel="Music Daily", views=900),
+        video("thai", "ข่าวเช้าวันนี้", views=50),
+    ])
+
+
+def ids(items):
+    return [it["id"] for it in items]
+
+
+def test_search_matches_inside_unspaced_text(pool):
+    assert ids(pool.search("オリンピック")) == ["jp"]
+    assert ids(pool.search("เช้า")) == ["thai"]
+
+
+def test_search_matches_infix(pool):
+    assert ids(pool.search("phone")) == ["phone"]
+    assert ids(pool.search("PHONE")) == ["phone"]
+
+
+def test_search_ignores_accents(pool):
+    assert ids(pool.search("cafe")) == ["cafe"]
+    assert ids(pool.search("café")) == ["cafe"]
+
+
+def test_search_short_terms(pool):
+    assert ids(pool.search("16")) == ["phone"]
+
+
+def test_search_no_match(pool):
+    assert pool.search("cricket") == []
+    # Every trigram is present, the term as a whole is not
+    assert pool.search("musicnews") == []
+
+
+def test_search_without_keyword_returns_everything(pool):
+    assert ids(pool.search(None)) == ["jp", "phone", "cafe", "news", "thai"]
+    assert ids(pool.search("  ")) == ["jp", "phone", "cafe", "news", "thai"]
+
+
+def test_search_all_and_any(pool):
+    assert ids(pool.search("music lofi")) == ["cafe"]
+    assert ids(pool.search("music lofi", match="any")) == ["cafe", "news"]
+
+
+def test_search_ranks_by_field_weight_then_views(pool):
+    # Title beats channelTitle even with fewer views
+    assert ids(pool.search("music", match="any")) == ["cafe", "news"]
+
+
+def test_search_ties_go_to_most_viewed():
+    pool = TrendingPool([video("a", "live show", views=10), video("b", "live show", views=20), video("c", "live show", views=20)])
+    assert ids(pool.search("live")) == ["b", "c", "a"]
+
+
+@pytest.mark.parametrize("duration, seconds", [
+    ("PT1H2M3S", 3723),
+    ("PT45S", 45),
+    ("PT10M", 600),
+    ("P1DT2H", 93600),
+    ("P1W", 604800),
+    ("P0D", 0),
+])
+def test_duration_seconds(duration, seconds):
+    assert duration_seconds(duration) == seconds
+
+
+@pytest.mark.parametrize("duration", [None, "", "P", "PT", "1H", "PT1.5S", "PTXS"])
+def test_duration_seconds_unparseable(duration):
+    assert duration_seconds(duration) is None
+
+
+def test_page_token_matches_youtube_encoding():
+    # Tokens the Data API hands out for the first pages of a 50 item chart
+    assert page_token(50) == "CDIQAA"
+    assert page_token(100) == "CGQQAA"
+    assert page_token(150) == "CJYBEAA"
+
+
+@pytest.mark.parametrize("offset", [0, 1, 49, 127, 128, 199, 16384])
+def test_page_token_round_trip(offset):
+    assert fake_youtube.token_offset(page_token(offset)) == offset
+
+
+def test_export_names_the_failed_regions(monkeypatch):
+    monkeypatch.setenv("YOUTUBE_API_KEY", "test")
+    monkeypatch.setattr(main, "quota_budget", quota.QuotaBudget(0, {"videos.list": 1.0}))
+    monkeypatch.setattr(main, "trending_cache", main.TrendingCache(300, 0))
+    main.app.state.http = None
+    client = TestClient(main.app)
+
+    response = client.get("/trending-videos/export", params={"regions": "GB,FR"})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["region"] for line in lines) == ["FR", "GB"]
+    assert all("quota" in line["error"] for line in lines)
+
+    response = client.get("/trending-videos/export", params={"regions": "GB", "format": "csv"})
+    header, row = response.text.splitlines()
+    assert header.endswith(",error")
+    assert row.startswith("GB,") and "quota" in row
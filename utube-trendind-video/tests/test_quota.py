@@ -0,0 +1,43 @@
+import datetime
+
+import pytest
+
+import quota
+
+
+def test_burst_is_capped_to_burst_hours():
+    budget = quota.QuotaBudget(2400, {"videos.list": 1.0}, burst_hours=1)
+    for _ in range(100):
+        budget.spend("videos.list")
+    with pytest.raises(quota.QuotaExhausted):
+        budget.spend("videos.list")
+    assert budget.rejected["videos.list"] == 1
+
+
+def test_bucket_holds_at_least_one_call():
+    budget = quota.QuotaBudget(1000, {"search.list": 0.5}, burst_hours=1)
+    budget.spend("search.list")
+    with pytest.raises(quota.QuotaExhausted):
+        budget.spend("search.list")
+
+
+def test_daily_share_caps_spend_until_reset(monkeypatch):
+    budget = quota.QuotaBudget(100, {"videos.list": 1.0}, burst_hours=24)
+    for _ in range(100):
+        budget.spend("videos.list")
+    # Refill alone would allow more, the quota day is used up
+    budget.buckets["videos.list"].tokens = 100
+    with pytest.raises(quota.QuotaExhausted) as exc:
+        budget.spend("videos.list")
+    assert 0 < exc.value.retry_after <= 86400 + 3600
+
+    monkeypatch.setattr(quota, "quota_day", lambda now=None: budget.day + datetime.timedelta(days=1))
+    budget.spend("videos.list")
+    assert budget.spent_today["videos.list"] == 1
+
+
+def test_quota_resets_at_pacific_midnight():
+    # 2026-10-18 23:30 PDT is 06:30 UTC the next day
+    now = 1792391400.0
+    assert str(quota.quota_day(now)) == "2026-10-18"
+    assert quota.seconds_until_quota_reset(now) == 1800
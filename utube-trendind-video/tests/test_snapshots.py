@@ -0,0 +1,53 @@
+import math
+
+import pytest
+
+import snapshots
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = snapshots.SnapshotStore(str(tmp_path / "snapshots.sqlite3"), retention_seconds=86400)
+    # (video_id, rank, views, likes, comments)
+    store.write("GB", [("a", 1, 1000, 10, 1), ("b", 2, 5000, None, 2), ("gone", 3, 100, 1, 1)], taken_at=0)
+    store.write("GB", [("b", 1, 9900, None, 4), ("a", 2, 1100, 20, None), ("new", 3, 50, 5, 0)], taken_at=3600)
+    return store
+
+
+def by_id(rows):
+    return {row["id"]: row for row in rows}
+
+
+def test_window_stats(store):
+    stats = snapshots.window_stats(store.load("GB", since=0))
+    assert list(stats["video_id"]) == ["a", "b", "gone", "new"]
+    assert list(stats["latest"]) == [True, True, False, True]
+    assert list(stats["rank_delta"]) == [-1, 1, 0, 0]
+    assert list(stats["views_per_hour"][:2]) == [100.0, 4900.0]
+    # Seen once, no time passed to measure a rate over
+    assert math.isnan(stats["views_per_hour"][3])
+    # Hidden likes or disabled comments on either end leave the delta unknown
+    assert math.isnan(stats["likes_delta"][1])
+    assert math.isnan(stats["comments_delta"][0])
+
+
+def test_window_stats_empty(store):
+    stats = snapshots.window_stats(store.load("FR", since=0))
+    assert snapshots.top(stats, "views_per_hour", 10) == []
+
+
+def test_top_puts_unknown_values_last(store):
+    stats = snapshots.window_stats(store.load("GB", since=0))
+    rows = snapshots.top(stats, "views_per_hour", 10)
+    assert [row["id"] for row in rows] == ["b", "a", "new"]
+    assert rows[2]["views_per_hour"] is None
+
+
+def test_top_limit_and_missing_counters(store):
+    stats = snapshots.window_stats(store.load("GB", since=0))
+    assert [row["id"] for row in snapshots.top(stats, "views_per_hour", 1)] == ["b"]
+    rows = by_id(snapshots.top(stats, "rank_delta", 10))
+    assert rows["b"]["likes_delta"] is None
+    assert rows["a"]["likes_delta"] == 10
+    assert rows["a"]["comments_delta"] is None
+    assert rows["new"]["first_seen"] == rows["new"]["last_seen"] == 3600